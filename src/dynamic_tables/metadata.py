@@ -1,6 +1,6 @@
 """Metadata schema management for PostgreSQL."""
 
-from typing import Optional
+from typing import Any, Dict, Optional
 import psycopg2
 from psycopg2.extensions import connection as Connection
 
@@ -37,7 +37,7 @@ CREATE TABLE IF NOT EXISTS refresh_history (
     dynamic_table VARCHAR NOT NULL,
     started_at TIMESTAMP NOT NULL,
     completed_at TIMESTAMP,
-    status VARCHAR NOT NULL,  -- SUCCESS, FAILED
+    status VARCHAR NOT NULL,  -- SUCCESS, SKIPPED, FAILED
     strategy_used VARCHAR,  -- FULL, AFFECTED_KEYS
     rows_affected BIGINT,
     affected_keys_count BIGINT,
@@ -47,10 +47,26 @@ CREATE TABLE IF NOT EXISTS refresh_history (
     FOREIGN KEY (dynamic_table) REFERENCES dynamic_tables(name) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_history_table ON refresh_history(dynamic_table);
+-- Serves latest-refresh lookups (dynamic_table = ? ORDER BY started_at DESC LIMIT 1)
+-- as a single index probe instead of a per-table sort
+CREATE INDEX IF NOT EXISTS idx_history_table_started
+    ON refresh_history(dynamic_table, started_at DESC);
 CREATE INDEX IF NOT EXISTS idx_history_started ON refresh_history(started_at);
 """
 
+# Server-side prepared statement for the most recent refresh of a table; parsed
+# and planned once per connection instead of on every lookup
+LATEST_HISTORY_STATEMENT = """
+PREPARE latest_history(text) AS
+SELECT dynamic_table, started_at, completed_at, status, strategy_used,
+       rows_affected, affected_keys_count, duration_ms, error_message,
+       source_snapshots
+FROM refresh_history
+WHERE dynamic_table = $1
+ORDER BY started_at DESC
+LIMIT 1
+"""
+
 
 class MetadataStore:
     """PostgreSQL metadata store for dynamic tables."""
@@ -63,6 +79,7 @@ class MetadataStore:
         """
         self.connection_string = connection_string
         self._conn: Optional[Connection] = None
+        self._history_prepared = False
 
     def connect(self) -> None:
         """Connect to PostgreSQL and initialize schema."""
@@ -83,6 +100,26 @@ class MetadataStore:
         if self._conn:
             self._conn.close()
             self._conn = None
+            self._history_prepared = False
+
+    def latest_history(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Get the most recent refresh_history row for a dynamic table.
+
+        Args:
+            table_name: Dynamic table name
+
+        Returns:
+            Column name to value mapping, or None if the table was never refreshed
+        """
+        with self.conn.cursor() as cur:
+            if not self._history_prepared:
+                cur.execute(LATEST_HISTORY_STATEMENT)
+                self._history_prepared = True
+            cur.execute("EXECUTE latest_history(%s)", (table_name,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            return {column.name: value for column, value in zip(cur.description, row)}
 
     @property
     def conn(self) -> Connection:
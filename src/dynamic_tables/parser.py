@@ -1,48 +1,92 @@
 """Dynamic table definitions and dependency management."""
 
+import heapq
 from dataclasses import dataclass
-from typing import List, Set, Dict
+from functools import lru_cache
+from typing import List, Set, Dict, Optional, Tuple
 import sqlglot
 from sqlglot import exp
+from sqlglot.dialects.dialect import Dialect
 
+# Resolved once so parse/generate calls skip the per-call dialect name lookup
+DUCKDB_DIALECT = Dialect.get_or_raise("duckdb")
 
-def extract_source_tables(query: str) -> List[str]:
-    """Extract source table names from query.
+
+@lru_cache(maxsize=512)
+def parse_query(query: str) -> exp.Expression:
+    """Parse a DuckDB query into a sqlglot AST, cached per query text.
+
+    The same definition SQL is parsed for source extraction, strategy selection
+    and snapshot rewriting on every refresh; caching means it is tokenized once.
+    The returned tree is shared: callers that modify it must ``copy()`` it first.
 
     Args:
         query: SQL query
 
     Returns:
-        List of table names (schema.table format if schema is specified)
+        Parsed expression tree
+    """
+    return sqlglot.parse_one(query, read=DUCKDB_DIALECT)
+
+
+@lru_cache(maxsize=1024)
+def _source_tables(query: str) -> Tuple[str, ...]:
+    """Extract sorted source table names, cached per query text.
+
+    Args:
+        query: SQL query
+
+    Returns:
+        Tuple of table names (schema.table format if schema is specified)
 
     Raises:
         ValueError: If query cannot be parsed
     """
     try:
-        parsed = sqlglot.parse_one(query, read="duckdb")
+        parsed = parse_query(query)
         tables = set()
 
+        # CTE names are referenced like tables but are not sources
+        cte_names = {cte.alias_or_name for cte in parsed.find_all(exp.CTE)}
+
         for table in parsed.find_all(exp.Table):
             table_name = table.name
+            if not table.db and table_name in cte_names:
+                continue
             # Include schema if present (db property in sqlglot), otherwise just table name
             if table.db:
                 tables.add(f"{table.db}.{table_name}")
             else:
                 tables.add(table_name)
 
-        return sorted(tables)
+        return tuple(sorted(tables))
     except Exception as e:
         raise ValueError(f"Failed to parse query: {e}")
 
 
-@dataclass
+def extract_source_tables(query: str) -> List[str]:
+    """Extract source table names from query.
+
+    Args:
+        query: SQL query
+
+    Returns:
+        List of table names (schema.table format if schema is specified)
+
+    Raises:
+        ValueError: If query cannot be parsed
+    """
+    return list(_source_tables(query))
+
+
+@dataclass(frozen=True, slots=True)
 class DynamicTableDefinition:
-    """Dynamic table definition."""
+    """Dynamic table definition (immutable and hashable)."""
 
     name: str
     schema_name: str
     query_sql: str
-    source_tables: List[str]
+    source_tables: Tuple[str, ...]
 
     @classmethod
     def create(cls, name: str, schema_name: str, query_sql: str) -> "DynamicTableDefinition":
@@ -56,7 +100,8 @@ class DynamicTableDefinition:
         Returns:
             DynamicTableDefinition instance
         """
-        source_tables = extract_source_tables(query_sql)
+        # The cached tuple is immutable, so it can be shared without copying
+        source_tables = _source_tables(query_sql)
         return cls(
             name=name,
             schema_name=schema_name,
@@ -71,6 +116,13 @@ class DependencyGraph:
     def __init__(self) -> None:
         """Initialize dependency graph."""
         self.graph: Dict[str, Set[str]] = {}
+        # Transitive dependencies of each table, kept closed under add_table so a
+        # cycle check is a set lookup instead of a DFS over the whole graph
+        self._ancestors: Dict[str, Set[str]] = {}
+        # Reverse edges: table name -> tables whose dependencies include it
+        self._dependents: Dict[str, Set[str]] = {}
+        # Cached topological order, cleared whenever an edge changes
+        self._topo_order: Optional[List[str]] = None
 
     def add_table(self, table: str, depends_on: List[str]) -> None:
         """Add a table and its dependencies.
@@ -82,16 +134,68 @@ class DependencyGraph:
         Raises:
             ValueError: If adding this table would create a cycle
         """
-        # Create a temporary graph with the new dependency
-        temp_graph = dict(self.graph)
-        temp_graph[table] = set(depends_on)
-
-        # Check for cycles
-        if self._has_cycle(temp_graph):
+        if table in self.graph:
+            # The graph is acyclic, so a new cycle has to pass through this table:
+            # some new dependency must already (transitively) depend on it. Paths
+            # into the table never use its old outgoing edges, so the current
+            # closure answers that without a DFS.
+            for dep in depends_on:
+                if dep == table or table in self._ancestors.get(dep, ()):
+                    raise ValueError(f"Circular dependency detected involving table '{table}'")
+            # Replacing dependencies can shrink reachability: rebuild the closure
+            self._unlink(table)
+            self._link(table, depends_on)
+            self._rebuild_ancestors()
+            return
+
+        ancestors: Set[str] = set()
+        for dep in depends_on:
+            ancestors.add(dep)
+            ancestors |= self._ancestors.get(dep, set())
+
+        # A cycle exists iff the table would become its own ancestor
+        if table in ancestors:
             raise ValueError(f"Circular dependency detected involving table '{table}'")
 
-        # No cycle, add it
-        self.graph[table] = set(depends_on)
+        # No cycle, add it and extend the closure of everything downstream
+        self._link(table, depends_on)
+        self._ancestors[table] = ancestors
+        pending = list(self._dependents.get(table, ()))
+        seen = set(pending)
+        while pending:
+            node = pending.pop()
+            self._ancestors[node] |= ancestors
+            for dependent in self._dependents.get(node, ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    pending.append(dependent)
+
+    def add_tables(self, entries: List[Tuple[str, List[str]]]) -> None:
+        """Add many tables at once, checking for cycles in a single pass.
+
+        Unlike repeated add_table() calls, the closure is rebuilt once and the
+        cycle check is one Tarjan SCC pass over the combined graph. Nothing is
+        added if the entries would introduce a cycle.
+
+        Args:
+            entries: (table, depends_on) pairs; existing tables are replaced
+
+        Raises:
+            ValueError: If the entries would create a cycle
+        """
+        candidate = dict(self.graph)
+        for table, depends_on in entries:
+            candidate[table] = set(depends_on)
+
+        cycle = self._find_cycle(candidate)
+        if cycle:
+            raise ValueError(f"Circular dependency detected: {' -> '.join(cycle)}")
+
+        for table, depends_on in entries:
+            if table in self.graph:
+                self._unlink(table)
+            self._link(table, depends_on)
+        self._rebuild_ancestors()
 
     def remove_table(self, table: str) -> None:
         """Remove a table from the graph.
@@ -99,7 +203,25 @@ class DependencyGraph:
         Args:
             table: Table name
         """
-        self.graph.pop(table, None)
+        if table in self.graph:
+            self._unlink(table)
+            self._rebuild_ancestors()
+
+    def _link(self, table: str, depends_on: List[str]) -> None:
+        """Store a table's dependencies and the matching reverse edges."""
+        self._topo_order = None
+        self.graph[table] = set(depends_on)
+        for dep in self.graph[table]:
+            self._dependents.setdefault(dep, set()).add(table)
+
+    def _unlink(self, table: str) -> None:
+        """Drop a table's dependencies and the matching reverse edges."""
+        self._topo_order = None
+        for dep in self.graph.pop(table):
+            dependents = self._dependents[dep]
+            dependents.discard(table)
+            if not dependents:
+                del self._dependents[dep]
 
     def topological_sort(self) -> List[str]:
         """Return tables in dependency order.
@@ -110,63 +232,144 @@ class DependencyGraph:
         Raises:
             ValueError: If graph has cycles
         """
-        if self._has_cycle(self.graph):
-            raise ValueError("Cannot sort: graph contains cycles")
+        if self._topo_order is None:
+            self._topo_order = self._compute_topological_order()
+        return list(self._topo_order)
 
-        # Build reverse graph - count how many tables depend on each table
-        in_degree = {node: 0 for node in self.graph}
+    def _compute_topological_order(self) -> List[str]:
+        """Run Kahn's algorithm over the current graph.
 
-        # Count incoming edges (how many tables does this table depend on)
+        Returns:
+            List of table names in topological order (dependencies first)
+
+        Raises:
+            ValueError: If graph has cycles
+        """
         # Only count dependencies that are also dynamic tables (in the graph)
-        for node in self.graph:
-            in_degree[node] = len([dep for dep in self.graph[node] if dep in self.graph])
+        in_degree = {
+            node: sum(1 for dep in deps if dep in self.graph) for node, deps in self.graph.items()
+        }
+
+        ready = [node for node, degree in in_degree.items() if degree == 0]
+
+        # Linear chain fast path: an acyclic graph with one root where no table
+        # has more than one dependent cannot branch or merge, so the order is a
+        # plain walk from the root with no ties to break
+        if len(ready) == 1 and all(len(self._dependents.get(n, ())) <= 1 for n in self.graph):
+            chain = []
+            node: Optional[str] = ready[0]
+            while node is not None and len(chain) < len(self.graph):
+                chain.append(node)
+                node = next(iter(self._dependents.get(node, ())), None)
+            if node is None and len(chain) == len(self.graph):
+                return chain
+            raise ValueError("Cannot sort: graph contains cycles")
 
-        # Start with nodes that have no dependencies
-        queue = [node for node in self.graph if in_degree[node] == 0]
+        # Kahn's algorithm; a heap makes ties resolve alphabetically so the
+        # order is deterministic regardless of insertion order
+        heapq.heapify(ready)
         result = []
 
-        while queue:
-            node = queue.pop(0)
+        while ready:
+            node = heapq.heappop(ready)
             result.append(node)
 
-            # Find all tables that depend on this node
-            for other in self.graph:
-                if node in self.graph[other]:
-                    in_degree[other] -= 1
-                    if in_degree[other] == 0:
-                        queue.append(other)
+            for dependent in self._dependents.get(node, ()):
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+
+        # add_table()/add_tables() reject cycles up front, so the whole-graph DFS
+        # that used to run before every sort is unnecessary; tables left with a
+        # non-zero in-degree still expose a cycle from a graph mutated directly
+        if len(result) != len(self.graph):
+            raise ValueError("Cannot sort: graph contains cycles")
 
         return result
 
-    def _has_cycle(self, graph: Dict[str, Set[str]]) -> bool:
-        """Check if graph has a cycle using DFS.
+    def _find_cycle(self, graph: Dict[str, Set[str]]) -> Optional[List[str]]:
+        """Find a cycle using an iterative Tarjan strongly-connected-components pass.
 
         Args:
             graph: Adjacency list representation
 
         Returns:
-            True if cycle exists
+            Cycle as a path that starts and ends with the same table, or None
         """
-        visited = set()
-        rec_stack = set()
-
-        def dfs(node: str) -> bool:
-            visited.add(node)
-            rec_stack.add(node)
-
-            for neighbor in graph.get(node, []):
-                if neighbor not in visited:
-                    if neighbor in graph and dfs(neighbor):
-                        return True
-                elif neighbor in rec_stack:
-                    return True
-
-            rec_stack.remove(node)
-            return False
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+
+        for root in graph:
+            if root in index:
+                continue
+
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+            while work:
+                node, neighbors = work[-1]
+                for neighbor in neighbors:
+                    if neighbor not in graph:
+                        continue
+                    if neighbor not in index:
+                        index[neighbor] = lowlink[neighbor] = len(index)
+                        stack.append(neighbor)
+                        on_stack.add(neighbor)
+                        work.append((neighbor, iter(graph[neighbor])))
+                        break
+                    if neighbor in on_stack:
+                        lowlink[node] = min(lowlink[node], index[neighbor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] != index[node]:
+                        continue
+
+                    # node is the root of an SCC: pop it off the stack
+                    component: Set[str] = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+
+                    if len(component) > 1 or node in graph[node]:
+                        return self._cycle_path(graph, component)
+
+        return None
+
+    @staticmethod
+    def _cycle_path(graph: Dict[str, Set[str]], component: Set[str]) -> List[str]:
+        """Walk edges inside a cyclic SCC until a table repeats."""
+        node = min(component)
+        path: List[str] = []
+        position: Dict[str, int] = {}
+        while node not in position:
+            position[node] = len(path)
+            path.append(node)
+            node = min(dep for dep in graph[node] if dep in component)
+        return path[position[node] :] + [node]
+
+    def _rebuild_ancestors(self) -> None:
+        """Recompute the transitive dependencies of every table.
+
+        Walks the (Kahn) topological order, so each table's dependencies are
+        already closed when it is reached; no recursion is needed.
+        """
+        ancestors: Dict[str, Set[str]] = {}
 
-        for node in graph:
-            if node not in visited:
-                if dfs(node):
-                    return True
+        for node in self.topological_sort():
+            result: Set[str] = set()
+            for dep in self.graph[node]:
+                result.add(dep)
+                if dep in ancestors:
+                    result |= ancestors[dep]
+            ancestors[node] = result
 
-        return False
+        self._ancestors = ancestors
@@ -191,6 +191,8 @@ def configure_duckdb_for_benchmarks(
     conn.execute("SET temp_directory = '/tmp/duckdb_temp'")
     conn.execute("SET preserve_insertion_order = false")  # Performance optimization
     conn.execute("SET enable_progress_bar = false")  # Cleaner benchmark output
+    # Reuse DuckLake file footers; GLOBAL so cursors (separate sessions) inherit it
+    conn.execute("SET GLOBAL parquet_metadata_cache = true")
 
 
 class BenchmarkSession:
@@ -1,14 +1,194 @@
 """Dynamic table refresh logic."""
 
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Set, Tuple
 from datetime import datetime, UTC
 import time
 import json
-import sqlglot
+import re
+import functools
+from psycopg2.extras import execute_values
 from sqlglot import exp
 
 from dynamic_tables.metadata import MetadataStore
-from dynamic_tables.parser import DynamicTableDefinition, DependencyGraph
+from dynamic_tables.parser import (
+    DUCKDB_DIALECT,
+    DynamicTableDefinition,
+    DependencyGraph,
+    parse_query,
+)
+
+# DuckDB requires the alias BEFORE the AT clause, but sqlglot generates AT before alias.
+# Matches "table AT (VERSION => N) AS alias" so it can be reordered; N is a snapshot
+# placeholder in the cached templates.
+_AT_ALIAS_RE = re.compile(r"(\w+)\s+AT\s+\((VERSION\s+=>\s+\w+)\)\s+AS\s+(\w+)")
+
+# Placeholder for the snapshot of the i-th table in a rewrite template; anchored to
+# the AT clause so identical text elsewhere in the query is left alone
+_SNAPSHOT_PLACEHOLDER_RE = re.compile(r"(?<=VERSION => )__snapshot_(\d+)__")
+
+
+@functools.lru_cache(maxsize=256)
+def _snapshot_template(query_sql: str, tables: Tuple[str, ...]) -> str:
+    """Render a query with an AT (VERSION => ...) placeholder on each listed table.
+
+    A table's sources are the same on every refresh and only the snapshot ids
+    change, so the parse, AST rewrite and SQL generation happen once per query;
+    each refresh just substitutes the ids into the cached text.
+
+    Args:
+        query_sql: SQL query to rewrite
+        tables: Table names to pin, in placeholder order
+
+    Returns:
+        SQL text with __snapshot_<i>__ standing in for the i-th table's snapshot
+    """
+    # Copy: the cached tree is shared and modified below
+    parsed = parse_query(query_sql).copy()
+    positions = {table: i for i, table in enumerate(tables)}
+
+    # Find all table references and inject snapshot clauses
+    for table_node in parsed.find_all(exp.Table):
+        position = positions.get(table_node.name)
+        if position is not None:
+            # Create HistoricalData node for AT (VERSION => snapshot_id)
+            # sqlglot natively supports this via HistoricalData expression
+            historical = exp.HistoricalData(
+                this="AT", kind="VERSION", expression=exp.Literal.number(f"__snapshot_{position}__")
+            )
+
+            # Attach the AT clause to the table node
+            table_node.set("when", historical)
+
+    # Post-process: DuckDB requires alias BEFORE AT clause, but sqlglot generates AT
+    # before alias. Reorder: "table AT (VERSION => N) AS alias" -> "table AS alias AT (...)"
+    # Note: sqlglot always generates explicit AS, even for implicit aliases in input
+    return _AT_ALIAS_RE.sub(r"\1 AS \3 AT (\2)", parsed.sql(dialect=DUCKDB_DIALECT))
+
+
+@functools.lru_cache(maxsize=256)
+def _group_by_keys(query_sql: str) -> Tuple[str, ...]:
+    """Extract GROUP BY column names from a query, cached per query text.
+
+    Table definitions are refreshed repeatedly with the same SQL, so the parse
+    only happens once per distinct query.
+
+    Args:
+        query_sql: SQL query to analyze
+
+    Returns:
+        Tuple of GROUP BY column names (empty if no GROUP BY)
+    """
+    try:
+        parsed = parse_query(query_sql)
+
+        # Find the GROUP BY clause
+        group_by = parsed.find(exp.Group)
+        if not group_by:
+            return ()
+
+        # Extract column names from GROUP BY expressions
+        keys = []
+        for expr in group_by.expressions:
+            # Handle simple column references
+            if isinstance(expr, exp.Column):
+                keys.append(expr.name)
+            # Handle positioned GROUP BY (e.g., GROUP BY 1, 2)
+            elif isinstance(expr, exp.Literal):
+                # For now, skip positional references (would need column list)
+                pass
+            else:
+                # For complex expressions, use the SQL text
+                keys.append(expr.sql(dialect=DUCKDB_DIALECT))
+
+        return tuple(keys)
+
+    except Exception:
+        # If we can't parse, return empty tuple (will fall back to full refresh)
+        return ()
+
+
+@dataclass
+class RefreshContext:
+    """Metadata lookups memoized for the duration of one refresh_tables() call.
+
+    Conflict detection, snapshot inheritance and the final snapshot bookkeeping
+    all read the same source_snapshots rows; the context fetches each dynamic
+    table's rows once and serves later reads from memory. Table definitions
+    are likewise fetched for the whole batch up front. Its cursor is the one
+    metadata cursor used for every read and write of the batch.
+    """
+
+    cursor: Any
+    graph: DependencyGraph
+    definitions: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # Tables that must refresh even if unchanged (conflict resolution), and the
+    # tables this batch has actually refreshed so far
+    forced: Set[str] = field(default_factory=set)
+    refreshed: Set[str] = field(default_factory=set)
+    # refresh_history rows of successful and skipped refreshes, written once the
+    # batch commits
+    pending_history: List[Tuple[Any, ...]] = field(default_factory=list)
+    _source_snapshots: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def source_snapshots(self, dynamic_table: str) -> Dict[str, int]:
+        """Return source table -> last snapshot recorded for a dynamic table.
+
+        The returned mapping is shared with the cache and must not be modified.
+        """
+        snapshots = self._source_snapshots.get(dynamic_table)
+        if snapshots is None:
+            self.cursor.execute(
+                """
+                SELECT source_table, last_snapshot
+                FROM source_snapshots
+                WHERE dynamic_table = %s
+            """,
+                (dynamic_table,),
+            )
+            snapshots = self._source_snapshots[dynamic_table] = dict(self.cursor.fetchall())
+        return snapshots
+
+    def preload(self, dynamic_tables: Iterable[str]) -> None:
+        """Fetch the snapshots of every not-yet-cached table in one query."""
+        missing = [name for name in dynamic_tables if name not in self._source_snapshots]
+        if not missing:
+            return
+
+        # Tables without recorded snapshots still get an (empty) entry
+        for name in missing:
+            self._source_snapshots[name] = {}
+
+        self.cursor.execute(
+            """
+            SELECT dynamic_table, source_table, last_snapshot
+            FROM source_snapshots
+            WHERE dynamic_table = ANY(%s)
+        """,
+            (missing,),
+        )
+        for dynamic_table, source_table, last_snapshot in self.cursor.fetchall():
+            self._source_snapshots[dynamic_table][source_table] = last_snapshot
+
+    def load_definitions(self, dynamic_tables: List[str]) -> None:
+        """Fetch (query_sql, schema_name) for every table of the batch in one query."""
+        self.cursor.execute(
+            """
+            SELECT name, query_sql, schema_name
+            FROM dynamic_tables
+            WHERE name = ANY(%s)
+        """,
+            (dynamic_tables,),
+        )
+        for name, query_sql, schema_name in self.cursor.fetchall():
+            self.definitions[name] = (query_sql, schema_name)
+
+    def record(self, dynamic_table: str, snapshots: Dict[str, int]) -> None:
+        """Mirror an upsert of a dynamic table's snapshots into the cache."""
+        self._source_snapshots[dynamic_table] = {
+            **self.source_snapshots(dynamic_table),
+            **snapshots,
+        }
 
 
 class DynamicTableRefresher:
@@ -40,11 +220,24 @@ class DynamicTableRefresher:
         if cursor.fetchone():
             raise ValueError(f"Dynamic table '{definition.name}' already exists")
 
-        # Build dependency graph to check for cycles
-        graph = self._load_dependency_graph()
-
-        # Add new table to graph (this will raise if cycle detected)
-        graph.add_table(definition.name, definition.source_tables)
+        # The new table has no stored edges yet, so it closes a cycle only if it is
+        # reachable upstream from its own sources. Walk just that subgraph in
+        # Postgres; LIMIT 1 stops the recursion as soon as the table is reached.
+        cursor.execute(
+            """
+            WITH RECURSIVE upstream_of(name) AS (
+                SELECT unnest(%s::text[])
+                UNION
+                SELECT d.upstream
+                FROM dependencies d
+                JOIN upstream_of u ON d.downstream = u.name
+            )
+            SELECT 1 FROM upstream_of WHERE name = %s LIMIT 1
+        """,
+            (list(definition.source_tables), definition.name),
+        )
+        if cursor.fetchone():
+            raise ValueError(f"Circular dependency detected involving table '{definition.name}'")
 
         # Insert table definition
         cursor.execute(
@@ -80,21 +273,29 @@ class DynamicTableRefresher:
         """
         cursor = self.metadata.conn.cursor()
 
-        # Check if other tables depend on this one
+        # Delete from metadata only if nothing depends on this table, checked in the
+        # same statement (CASCADE will handle dependencies and history)
         cursor.execute(
             """
-            SELECT downstream FROM dependencies WHERE upstream = %s
+            DELETE FROM dynamic_tables
+            WHERE name = %s
+            AND NOT EXISTS (SELECT 1 FROM dependencies WHERE upstream = %s)
         """,
-            (table_name,),
+            (table_name, table_name),
         )
 
-        dependents = cursor.fetchall()
-        if dependents:
-            dependent_names = [row[0] for row in dependents]
-            raise ValueError(f"Cannot drop '{table_name}': tables {dependent_names} depend on it")
-
-        # Delete from metadata (CASCADE will handle dependencies and history)
-        cursor.execute("DELETE FROM dynamic_tables WHERE name = %s", (table_name,))
+        if cursor.rowcount == 0:
+            # Either the table is unknown or it has dependents; only the latter is an error
+            cursor.execute(
+                "SELECT downstream FROM dependencies WHERE upstream = %s ORDER BY downstream",
+                (table_name,),
+            )
+            dependent_names = [row[0] for row in cursor.fetchall()]
+            if dependent_names:
+                self.metadata.conn.rollback()
+                raise ValueError(
+                    f"Cannot drop '{table_name}': tables {dependent_names} depend on it"
+                )
 
         # Drop the actual table in DuckDB (DDL - outside transaction)
         # IF EXISTS handles the case where table doesn't exist, no need to catch exceptions
@@ -111,33 +312,7 @@ class DynamicTableRefresher:
         Returns:
             List of GROUP BY column names (empty list if no GROUP BY)
         """
-        try:
-            parsed = sqlglot.parse_one(query_sql, dialect="duckdb")
-
-            # Find the GROUP BY clause
-            group_by = parsed.find(exp.Group)
-            if not group_by:
-                return []
-
-            # Extract column names from GROUP BY expressions
-            keys = []
-            for expr in group_by.expressions:
-                # Handle simple column references
-                if isinstance(expr, exp.Column):
-                    keys.append(expr.name)
-                # Handle positioned GROUP BY (e.g., GROUP BY 1, 2)
-                elif isinstance(expr, exp.Literal):
-                    # For now, skip positional references (would need column list)
-                    pass
-                else:
-                    # For complex expressions, use the SQL text
-                    keys.append(expr.sql(dialect="duckdb"))
-
-            return keys
-
-        except Exception:
-            # If we can't parse, return empty list (will fall back to full refresh)
-            return []
+        return list(_group_by_keys(query_sql))
 
     def _get_affected_keys(
         self,
@@ -213,46 +388,20 @@ class DynamicTableRefresher:
             RuntimeError: If query rewriting fails
         """
         try:
-            import re
+            tables = tuple(sorted(snapshot_map))
+            template = _snapshot_template(query_sql, tables)
 
-            # Parse the SQL query
-            parsed = sqlglot.parse_one(query_sql, dialect="duckdb")
-
-            # Find all table references and inject snapshot clauses
-            for table_node in parsed.find_all(exp.Table):
-                table_name = table_node.name
-
-                if table_name in snapshot_map:
-                    snapshot_id = snapshot_map[table_name]
-
-                    # Create HistoricalData node for AT (VERSION => snapshot_id)
-                    # sqlglot natively supports this via HistoricalData expression
-                    historical = exp.HistoricalData(
-                        this="AT", kind="VERSION", expression=exp.Literal.number(snapshot_id)
-                    )
-
-                    # Attach the AT clause to the table node
-                    table_node.set("when", historical)
-
-            # Convert back to SQL
-            result_sql = parsed.sql(dialect="duckdb")
-
-            # Post-process: DuckDB requires alias BEFORE AT clause, but sqlglot generates AT before alias
-            # Reorder: "table AT (VERSION => N) AS alias" -> "table AS alias AT (VERSION => N)"
-            # Note: sqlglot always generates explicit AS, even for implicit aliases in input
-            result_sql = re.sub(
-                r"(\w+)\s+AT\s+\((VERSION\s+=>\s+\d+)\)\s+AS\s+(\w+)",
-                r"\1 AS \3 AT (\2)",
-                result_sql,
+            return _SNAPSHOT_PLACEHOLDER_RE.sub(
+                lambda match: str(snapshot_map[tables[int(match.group(1))]]), template
             )
 
-            return result_sql
-
         except Exception as e:
             # If parsing fails, raise error - we cannot proceed without snapshot isolation
             raise RuntimeError(f"Failed to rewrite query with snapshot isolation: {e}") from e
 
-    def _refresh_single_table(self, table_name: str, batch_snapshot: int) -> Dict[str, Any]:
+    def _refresh_single_table(
+        self, table_name: str, batch_snapshot: int, ctx: RefreshContext
+    ) -> Dict[str, Any]:
         """Internal method to refresh a single table within a transaction.
 
         Caller is responsible for transaction management (BEGIN/COMMIT/ROLLBACK).
@@ -260,6 +409,7 @@ class DynamicTableRefresher:
         Args:
             table_name: Name of table to refresh
             batch_snapshot: Snapshot to use for all base tables
+            ctx: Metadata lookups shared across the batch
 
         Returns:
             Refresh metrics (rows_affected, duration_ms, etc.)
@@ -267,64 +417,45 @@ class DynamicTableRefresher:
         Raises:
             ValueError: If table doesn't exist
         """
-        cursor = self.metadata.conn.cursor()
-
-        # Get table definition
-        cursor.execute(
-            """
-            SELECT query_sql, schema_name
-            FROM dynamic_tables
-            WHERE name = %s
-        """,
-            (table_name,),
-        )
-
-        row = cursor.fetchone()
-        if not row:
+        # Get table definition (loaded for the whole batch by refresh_tables)
+        definition = ctx.definitions.get(table_name)
+        if definition is None:
             raise ValueError(f"Dynamic table '{table_name}' does not exist")
 
-        query_sql, schema_name = row
-
-        # Get direct dependencies
-        cursor.execute(
-            """
-            SELECT DISTINCT upstream
-            FROM dependencies
-            WHERE downstream = %s
-        """,
-            (table_name,),
-        )
+        query_sql, schema_name = definition
 
-        direct_dependencies = [row[0] for row in cursor.fetchall()]
+        # Direct dependencies come from the batch's dependency graph
+        direct_dependencies = ctx.graph.graph[table_name]
         snapshots_to_use = {}
 
         # Get previous snapshots (if any) for incremental refresh decision
-        cursor.execute(
-            """
-            SELECT source_table, last_snapshot
-            FROM source_snapshots
-            WHERE dynamic_table = %s
-        """,
-            (table_name,),
-        )
-        previous_snapshots = {row[0]: row[1] for row in cursor.fetchall()}
+        previous_snapshots = ctx.source_snapshots(table_name)
+
+        # Every DuckLake commit creates a new snapshot, so if each dependency was last
+        # seen at the batch snapshot and none was refreshed in this batch, the inputs
+        # are unchanged and the refresh would rewrite identical rows
+        if (
+            previous_snapshots
+            and table_name not in ctx.forced
+            and not ctx.refreshed.intersection(direct_dependencies)
+            and all(previous_snapshots.get(dep) == batch_snapshot for dep in direct_dependencies)
+        ):
+            skipped = {
+                "dynamic_table": table_name,
+                "started_at": datetime.now(UTC),
+                "strategy_used": None,
+                "source_snapshots": json.dumps(previous_snapshots),
+            }
+            ctx.pending_history.append(
+                self._history_row(skipped, status="SKIPPED", rows_affected=0, duration_ms=0)
+            )
+            return {"status": "SKIPPED", "rows_affected": 0, "duration_ms": 0}
+        ctx.refreshed.add(table_name)
 
         # Inherit snapshots from dynamic table dependencies
         for dep in direct_dependencies:
-            cursor.execute("SELECT name FROM dynamic_tables WHERE name = %s", (dep,))
-            is_dynamic_table = cursor.fetchone() is not None
-
-            if is_dynamic_table:
-                cursor.execute(
-                    """
-                    SELECT source_table, last_snapshot
-                    FROM source_snapshots
-                    WHERE dynamic_table = %s
-                """,
-                    (dep,),
-                )
-                dep_snapshots = {row[0]: row[1] for row in cursor.fetchall()}
-                snapshots_to_use.update(dep_snapshots)
+            if dep in ctx.graph.graph:
+                snapshots_to_use.update(ctx.source_snapshots(dep))
 
         # Use batch_snapshot for missing dependencies
         for dep in direct_dependencies:
@@ -338,40 +469,32 @@ class DynamicTableRefresher:
         # Rewrite query with snapshot isolation
         query_with_snapshots = self._rewrite_query_with_snapshots(query_sql, snapshots_to_use)
 
-        # Record start time
+        # Record start time; the history row is written once, when the outcome is known
         started_at = datetime.now(UTC)
-        start_time = time.time()
-
-        # Record refresh in history with the snapshots we actually used
-        cursor.execute(
-            """
-            INSERT INTO refresh_history (
-                dynamic_table, started_at, status, strategy_used, source_snapshots
-            ) VALUES (%s, %s, 'RUNNING', %s, %s)
-            RETURNING id
-        """,
-            (table_name, started_at, strategy, json.dumps(snapshots_to_use)),
-        )
-
-        result = cursor.fetchone()
-        if result is None:
-            raise RuntimeError("Failed to create refresh history record")
-        history_id = result[0]
-        self.metadata.conn.commit()
+        start_time = time.perf_counter_ns()
+        history = {
+            "dynamic_table": table_name,
+            "started_at": started_at,
+            "strategy_used": strategy,
+            "source_snapshots": json.dumps(snapshots_to_use),
+        }
 
         try:
             # Full table name with schema
             full_table_name = f"{schema_name}.{table_name}" if schema_name != "main" else table_name
 
             # Check if table exists
-            table_exists = (
-                self.duckdb.execute(f"""
-                SELECT COUNT(*) FROM information_schema.tables 
-                WHERE table_name = '{table_name}'
-                AND table_schema = '{schema_name}'
-            """).fetchone()[0]
-                > 0
-            )
+            existing = self.duckdb.execute(
+                """
+                SELECT 1 FROM duckdb_tables()
+                WHERE database_name = current_database()
+                AND schema_name = ?
+                AND table_name = ?
+                LIMIT 1
+            """,
+                [schema_name, table_name],
+            ).fetchone()
+            table_exists = existing is not None
 
             if not table_exists:
                 # Create table from query (DDL - outside transaction)
@@ -467,88 +590,113 @@ class DynamicTableRefresher:
                 ).fetchone()[0]
 
             # Calculate duration
-            duration_ms = int((time.time() - start_time) * 1000)
-
-            # Update history record
-            cursor.execute(
-                """
-                UPDATE refresh_history
-                SET completed_at = %s,
-                    status = 'SUCCESS',
-                    rows_affected = %s,
-                    affected_keys_count = %s,
-                    duration_ms = %s
-                WHERE id = %s
-            """,
-                (datetime.now(UTC), rows_affected, affected_keys_count, duration_ms, history_id),
+            duration_ms = (time.perf_counter_ns() - start_time) // 1_000_000
+
+            # Queue history; refresh_tables writes the batch's rows in one statement
+            ctx.pending_history.append(
+                self._history_row(
+                    history,
+                    status="SUCCESS",
+                    rows_affected=rows_affected,
+                    affected_keys_count=affected_keys_count,
+                    duration_ms=duration_ms,
+                )
             )
 
             return {"status": "SUCCESS", "rows_affected": rows_affected, "duration_ms": duration_ms}
 
         except Exception as e:
-            # Update history with error
-            cursor.execute(
-                """
-                UPDATE refresh_history
-                SET completed_at = %s,
-                    status = 'FAILED',
-                    error_message = %s
-                WHERE id = %s
-            """,
-                (datetime.now(UTC), str(e), history_id),
-            )
+            # The batch is rolled back (its queued history rows are never written);
+            # commit only the failure record
+            self.metadata.conn.rollback()
+            failure = self._history_row(history, status="FAILED", error_message=str(e))
+            self._record_history(ctx.cursor, [failure])
+            self.metadata.conn.commit()
             raise
 
-    def _detect_conflicts(self, table_names: List[str]) -> set[str]:
+    @staticmethod
+    def _history_row(
+        history: Dict[str, Any],
+        status: str,
+        rows_affected: int | None = None,
+        affected_keys_count: int | None = None,
+        duration_ms: int | None = None,
+        error_message: str | None = None,
+    ) -> Tuple[Any, ...]:
+        """Build a completed refresh_history row.
+
+        Args:
+            history: Values known when the refresh started (dynamic_table,
+                started_at, strategy_used, source_snapshots)
+            status: SUCCESS, SKIPPED or FAILED
+            rows_affected: Rows in the table after refresh
+            affected_keys_count: Number of recomputed keys (incremental only)
+            duration_ms: Refresh duration
+            error_message: Failure reason
+
+        Returns:
+            Column values in _record_history() order
+        """
+        return (
+            history["dynamic_table"],
+            history["started_at"],
+            datetime.now(UTC),
+            status,
+            history["strategy_used"],
+            rows_affected,
+            affected_keys_count,
+            duration_ms,
+            error_message,
+            history["source_snapshots"],
+        )
+
+    def _record_history(self, cursor: Any, rows: List[Tuple[Any, ...]]) -> None:
+        """Insert completed refresh_history rows in one statement.
+
+        Args:
+            cursor: Metadata store cursor
+            rows: Rows built by _history_row()
+        """
+        execute_values(
+            cursor,
+            """
+            INSERT INTO refresh_history (
+                dynamic_table, started_at, completed_at, status, strategy_used,
+                rows_affected, affected_keys_count, duration_ms, error_message,
+                source_snapshots
+            ) VALUES %s
+        """,
+            rows,
+        )
+
+    def _detect_conflicts(self, table_names: List[str], ctx: RefreshContext) -> set[str]:
         """Detect dependencies with conflicting snapshots for the given tables.
 
         Args:
             table_names: Tables to check for conflicts
+            ctx: Metadata lookups shared across the batch
 
         Returns:
             Set of additional tables that need to be refreshed to resolve conflicts
         """
-        cursor = self.metadata.conn.cursor()
+        dependencies = ctx.graph.graph
         conflicting_deps: set[str] = set()
 
         for table_name in table_names:
-            # Get direct dependencies
-            cursor.execute(
-                """
-                SELECT DISTINCT upstream
-                FROM dependencies
-                WHERE downstream = %s
-            """,
-                (table_name,),
-            )
-
-            direct_dependencies = [row[0] for row in cursor.fetchall()]
+            # Only dynamic table dependencies have recorded snapshots, and it takes
+            # at least two of them to disagree
+            dynamic_deps = [dep for dep in dependencies[table_name] if dep in dependencies]
+            if len(dynamic_deps) < 2:
+                continue
 
             # Track which dependency used which snapshot for each source table
             snapshot_sources: dict[str, dict[str, int]] = {}
 
-            for dep in direct_dependencies:
-                # Check if this dependency is a dynamic table
-                cursor.execute("SELECT name FROM dynamic_tables WHERE name = %s", (dep,))
-                is_dynamic_table = cursor.fetchone() is not None
-
-                if is_dynamic_table:
-                    # Get the snapshots this dependency used
-                    cursor.execute(
-                        """
-                        SELECT source_table, last_snapshot
-                        FROM source_snapshots
-                        WHERE dynamic_table = %s
-                    """,
-                        (dep,),
-                    )
-                    dep_snapshots = {row[0]: row[1] for row in cursor.fetchall()}
-
-                    # Track which dependency used which snapshot for each source
-                    for source_table, snapshot_id in dep_snapshots.items():
-                        if source_table not in snapshot_sources:
-                            snapshot_sources[source_table] = {}
-                        snapshot_sources[source_table][dep] = snapshot_id
+            for dep in dynamic_deps:
+                for source_table, snapshot_id in ctx.source_snapshots(dep).items():
+                    if source_table not in snapshot_sources:
+                        snapshot_sources[source_table] = {}
+                    snapshot_sources[source_table][dep] = snapshot_id
 
             # Detect conflicts: source tables used by multiple dependencies with different snapshots
             for source_table, dep_snapshots in snapshot_sources.items():
@@ -561,6 +709,25 @@ class DynamicTableRefresher:
 
         return conflicting_deps
 
+    @staticmethod
+    def _snapshot_scope(graph: DependencyGraph, table_names: Iterable[str]) -> set[str]:
+        """Return the tables plus their direct dynamic-table dependencies."""
+        return {
+            name
+            for table in table_names
+            for name in (table, *graph.graph[table])
+            if name in graph.graph
+        }
+
+    def _latest_snapshot(self) -> int | None:
+        """Return the newest DuckLake snapshot id, or None if there are none.
+
+        MAX() is a single-pass aggregate; ORDER BY ... LIMIT 1 over the
+        snapshots() table function would sort the whole snapshot list.
+        """
+        result = self.duckdb.execute("SELECT MAX(snapshot_id) FROM ducklake.snapshots()").fetchone()
+        return None if result is None or result[0] is None else int(result[0])
+
     def refresh_tables(self, table_names: List[str] | None = None) -> List[Dict[str, Any]]:
         """Refresh specified dynamic tables (or all if None) in dependency order.
 
@@ -571,6 +738,9 @@ class DynamicTableRefresher:
         If refreshing a specific subset of tables, automatically detects and includes
         any dependencies that have conflicting snapshots and need to be refreshed together.
 
+        Tables whose dependencies have not changed since their last refresh are
+        skipped and reported with status SKIPPED.
+
         Args:
             table_names: List of table names to refresh. If None, refreshes all tables.
 
@@ -580,19 +750,22 @@ class DynamicTableRefresher:
         Raises:
             ValueError: If any specified table doesn't exist
         """
+        # Loaded once per batch: other refreshers may create or drop tables between calls
         graph = self._load_dependency_graph()
         all_sorted_tables = graph.topological_sort()
+        ctx = RefreshContext(self.metadata.conn.cursor(), graph)
 
         # Filter to requested tables if specified
         if table_names is not None:
             # Validate that all requested tables exist
-            all_tables_set = set(all_sorted_tables)
             for table in table_names:
-                if table not in all_tables_set:
+                if table not in graph.graph:
                     raise ValueError(f"Dynamic table '{table}' does not exist")
 
             # Detect and add conflicting dependencies
-            conflicting_deps = self._detect_conflicts(table_names)
+            ctx.preload(self._snapshot_scope(graph, table_names))
+            conflicting_deps = self._detect_conflicts(table_names, ctx)
+            ctx.forced.update(conflicting_deps)
 
             # Combine requested tables with conflicting dependencies
             tables_to_refresh_set = set(table_names) | conflicting_deps
@@ -602,21 +775,18 @@ class DynamicTableRefresher:
         else:
             tables_to_refresh = all_sorted_tables
 
+        # One query for every snapshot map the batch reads (only the tables
+        # not already loaded for conflict detection)
+        ctx.preload(self._snapshot_scope(graph, tables_to_refresh))
+        ctx.load_definitions(tables_to_refresh)
+
         # Capture snapshot ONCE at the start of the batch
         # All tables will use this snapshot for base tables
-        result = self.duckdb.execute(
-            """
-            SELECT snapshot_id 
-            FROM ducklake.snapshots() 
-            ORDER BY snapshot_id DESC 
-            LIMIT 1
-        """
-        ).fetchone()
-
-        if result is None:
+        latest = self._latest_snapshot()
+        if latest is None:
             raise RuntimeError("No snapshots available in DuckLake")
 
-        batch_snapshot: int = int(result[0])
+        batch_snapshot: int = latest
 
         results = []
 
@@ -625,7 +795,7 @@ class DynamicTableRefresher:
 
         try:
             for table_name in tables_to_refresh:
-                result = self._refresh_single_table(table_name, batch_snapshot=batch_snapshot)
+                result = self._refresh_single_table(table_name, batch_snapshot, ctx)
                 result["table"] = table_name
                 results.append(result)
 
@@ -633,82 +803,63 @@ class DynamicTableRefresher:
             self.duckdb.execute("COMMIT")
 
             # Capture final snapshot AFTER commit - this is what we'll use for next refresh
-            result = self.duckdb.execute(
-                """
-                SELECT snapshot_id 
-                FROM ducklake.snapshots() 
-                ORDER BY snapshot_id DESC 
-                LIMIT 1
-            """
-            ).fetchone()
-
-            if result is None:
+            latest = self._latest_snapshot()
+            if latest is None:
                 raise RuntimeError("No snapshots available after commit")
 
-            final_snapshot: int = int(result[0])
+            final_snapshot: int = latest
 
             # Update source_snapshots to use the final snapshot (after commit)
             # This ensures next refresh will see changes from this point forward
-            cursor = self.metadata.conn.cursor()
+            snapshot_rows: List[Tuple[str, str, int]] = []
             for table_name in tables_to_refresh:
-                # Get direct dependencies for this table
-                cursor.execute(
-                    """
-                    SELECT DISTINCT upstream
-                    FROM dependencies
-                    WHERE downstream = %s
-                """,
-                    (table_name,),
-                )
-                direct_dependencies = [row[0] for row in cursor.fetchall()]
-
                 # Track all source tables (both direct and inherited)
                 all_source_snapshots = {}
 
-                for dep in direct_dependencies:
-                    # Check if dependency is a dynamic table
-                    cursor.execute("SELECT name FROM dynamic_tables WHERE name = %s", (dep,))
-                    is_dynamic_table = cursor.fetchone() is not None
-
-                    if is_dynamic_table:
-                        # Inherit snapshots from dynamic table dependencies
-                        cursor.execute(
-                            """
-                            SELECT source_table, last_snapshot
-                            FROM source_snapshots
-                            WHERE dynamic_table = %s
-                        """,
-                            (dep,),
-                        )
-                        inherited_snapshots = {row[0]: row[1] for row in cursor.fetchall()}
-                        all_source_snapshots.update(inherited_snapshots)
+                for dep in graph.graph[table_name]:
+                    if dep in graph.graph:
+                        # Inherit snapshots from dynamic table dependencies (a dependency
+                        # refreshed in this batch was already recorded: dependency order)
+                        all_source_snapshots.update(ctx.source_snapshots(dep))
 
                     # Also track the dependency itself with final snapshot
                     all_source_snapshots[dep] = final_snapshot
 
-                # Update source_snapshots with all tracked sources
-                for source_table, snapshot_id in all_source_snapshots.items():
-                    cursor.execute(
-                        """
-                        INSERT INTO source_snapshots (dynamic_table, source_table, last_snapshot)
-                        VALUES (%s, %s, %s)
-                        ON CONFLICT (dynamic_table, source_table)
-                        DO UPDATE SET 
-                            last_snapshot = EXCLUDED.last_snapshot
-                    """,
-                        (table_name, source_table, snapshot_id),
-                    )
+                # Queue the rows; dependents read the new values from the context
+                snapshot_rows.extend(
+                    (table_name, source_table, snapshot_id)
+                    for source_table, snapshot_id in all_source_snapshots.items()
+                )
+                ctx.record(table_name, all_source_snapshots)
+
+            # Upsert every tracked source of the batch in one statement
+            if snapshot_rows:
+                execute_values(
+                    ctx.cursor,
+                    """
+                    INSERT INTO source_snapshots (dynamic_table, source_table, last_snapshot)
+                    VALUES %s
+                    ON CONFLICT (dynamic_table, source_table)
+                    DO UPDATE SET last_snapshot = EXCLUDED.last_snapshot
+                """,
+                    snapshot_rows,
+                )
+
+            # History of every table refreshed in the batch, also in one statement
+            if ctx.pending_history:
+                self._record_history(ctx.cursor, ctx.pending_history)
 
             # Commit all metadata changes
             self.metadata.conn.commit()
 
         except Exception:
-            # Rollback everything on failure
+            # Rollback everything on failure (including SUCCESS history rows of this batch)
             try:
                 self.duckdb.execute("ROLLBACK")
             except Exception:
                 # Ignore rollback errors - we want to raise the original exception
                 pass
+            self.metadata.conn.rollback()
             raise
 
         return results
@@ -726,16 +877,20 @@ class DynamicTableRefresher:
             ORDER BY name
         """)
 
-        tables = []
-        for row in cursor.fetchall():
-            tables.append(
-                {
-                    "name": row[0],
-                    "schema": row[1],
-                }
-            )
+        return [{"name": name, "schema": schema} for name, schema in cursor.fetchall()]
 
-        return tables
+    def table_exists(self, table_name: str) -> bool:
+        """Check whether a dynamic table is registered in metadata.
+
+        Args:
+            table_name: Name of the dynamic table
+
+        Returns:
+            True if the table is registered
+        """
+        cursor = self.metadata.conn.cursor()
+        cursor.execute("SELECT 1 FROM dynamic_tables WHERE name = %s LIMIT 1", (table_name,))
+        return cursor.fetchone() is not None
 
     def _load_dependency_graph(self) -> DependencyGraph:
         """Load current dependency graph from metadata.
@@ -753,10 +908,10 @@ class DynamicTableRefresher:
             GROUP BY dt.name
         """)
 
+        # Filter out nulls from the LEFT JOIN and check cycles once for the batch
         graph = DependencyGraph()
-        for row in cursor.fetchall():
-            table_name = row[0]
-            dependencies = [dep for dep in row[1] if dep]  # Filter out nulls
-            graph.add_table(table_name, dependencies)
+        graph.add_tables(
+            [(table_name, [dep for dep in deps if dep]) for table_name, deps in cursor.fetchall()]
+        )
 
         return graph
@@ -15,8 +15,16 @@ pytest_plugins = ["tests.conftest_benchmark"]
 
 @pytest.fixture(scope="session")
 def postgres_container() -> Iterator[Any]:
-    """PostgreSQL container for metadata store."""
-    with PostgresContainer("postgres:16-alpine") as postgres:
+    """PostgreSQL container for metadata store.
+
+    Durability is switched off: the container is thrown away after the session,
+    and both the metadata store and the DuckLake catalog commit on every refresh,
+    so WAL fsyncs would otherwise dominate small test transactions.
+    """
+    postgres = PostgresContainer("postgres:16-alpine").with_command(
+        "postgres -c fsync=off -c synchronous_commit=off -c full_page_writes=off"
+    )
+    with postgres:
         yield postgres
 
 
@@ -27,9 +35,13 @@ def minio_container() -> Iterator[Any]:
         yield minio
 
 
-@pytest.fixture
-def metadata_store(postgres_container: Any) -> Iterator[MetadataStore]:
-    """Initialize metadata store with test database."""
+@pytest.fixture(scope="session")
+def _metadata_store_session(postgres_container: Any) -> Iterator[MetadataStore]:
+    """Single metadata store connection shared by the whole session.
+
+    Connecting and running the schema DDL once avoids a fresh libpq handshake
+    and catalog round trip for every test.
+    """
     # Get connection URL and replace sqlalchemy driver with postgresql
     connection_string = postgres_container.get_connection_url().replace(
         "postgresql+psycopg2://", "postgresql://"
@@ -37,16 +49,30 @@ def metadata_store(postgres_container: Any) -> Iterator[MetadataStore]:
     store = MetadataStore(connection_string)
     store.connect()
     yield store
+    store.close()
+
+
+@pytest.fixture
+def metadata_store(_metadata_store_session: MetadataStore) -> Iterator[MetadataStore]:
+    """Metadata store with empty tables for each test."""
+    store = _metadata_store_session
+    yield store
 
-    # Clean up tables between tests
+    # Clean up tables between tests; a failed test may leave an aborted transaction
+    store.conn.rollback()
     cursor = store.conn.cursor()
-    cursor.execute("TRUNCATE TABLE refresh_history CASCADE")
-    cursor.execute("TRUNCATE TABLE dependencies CASCADE")
-    cursor.execute("TRUNCATE TABLE source_snapshots CASCADE")
-    cursor.execute("TRUNCATE TABLE dynamic_tables CASCADE")
+    cursor.execute(
+        "TRUNCATE TABLE refresh_history, dependencies, source_snapshots, dynamic_tables CASCADE"
+    )
     store.conn.commit()
 
-    store.close()
+
+@pytest.fixture
+def meta_cursor(metadata_store: MetadataStore) -> Iterator[Any]:
+    """One metadata cursor shared by all probes in a test."""
+    cursor = metadata_store.conn.cursor()
+    yield cursor
+    cursor.close()
 
 
 @pytest.fixture
@@ -67,9 +93,13 @@ def minio_client(minio_container: Any) -> Iterator[Tuple[Minio, str]]:
     yield client, bucket_name
 
 
-@pytest.fixture
-def duckdb_conn(minio_container: Any, postgres_container: Any) -> Iterator[Any]:
-    """DuckDB connection with DuckLake extension and MinIO backend."""
+@pytest.fixture(scope="session")
+def _ducklake_conn(minio_container: Any, postgres_container: Any) -> Iterator[Any]:
+    """DuckDB instance with DuckLake attached, set up once per session.
+
+    Extension loading, S3 configuration and the catalog ATTACH are the expensive
+    part of a DuckLake connection; tests get cheap cursors onto this instance.
+    """
     conn = duckdb.connect(":memory:")
 
     # Ensure bucket exists
@@ -93,13 +123,13 @@ def duckdb_conn(minio_container: Any, postgres_container: Any) -> Iterator[Any]:
         conn.execute("INSTALL ducklake;")
         conn.execute("LOAD ducklake;")
 
-        # Configure S3 settings for MinIO
+        # Configure S3 settings for MinIO (GLOBAL so every cursor sees them)
         conn.execute(f"""
-            SET s3_endpoint='{config["endpoint"]}';
-            SET s3_access_key_id='{minio_container.access_key}';
-            SET s3_secret_access_key='{minio_container.secret_key}';
-            SET s3_use_ssl=false;
-            SET s3_url_style='path';
+            SET GLOBAL s3_endpoint='{config["endpoint"]}';
+            SET GLOBAL s3_access_key_id='{minio_container.access_key}';
+            SET GLOBAL s3_secret_access_key='{minio_container.secret_key}';
+            SET GLOBAL s3_use_ssl=false;
+            SET GLOBAL s3_url_style='path';
         """)
 
         # Attach DuckLake with PostgreSQL as catalog and S3 for data
@@ -123,24 +153,36 @@ def duckdb_conn(minio_container: Any, postgres_container: Any) -> Iterator[Any]:
             );
         """)
 
-        # Switch to the DuckLake database
-        conn.execute("USE ducklake;")
-
     except Exception as e:
         conn.close()
         raise RuntimeError(f"DuckLake extension is required but failed to load: {e}") from e
 
     yield conn
 
+    conn.close()
+
+
+@pytest.fixture
+def duckdb_conn(_ducklake_conn: Any) -> Iterator[Any]:
+    """DuckDB connection with DuckLake extension and MinIO backend."""
+    conn = _ducklake_conn.cursor()
+
+    # Switch to the DuckLake database (the default database is per connection)
+    conn.execute("USE ducklake;")
+
+    yield conn
+
     # Cleanup - drop all tables after each test
+    # duckdb_tables() lists base tables only, without the information_schema view's joins
     tables = conn.execute("""
-        SELECT table_name FROM information_schema.tables 
-        WHERE table_schema = 'main' 
-        AND table_type = 'BASE TABLE'
+        SELECT table_name FROM duckdb_tables()
+        WHERE database_name = current_database()
+        AND schema_name = 'main'
     """).fetchall()
 
-    # Drop each table
-    for (table_name,) in tables:
-        conn.execute(f"DROP TABLE IF EXISTS main.{table_name}")
+    # Drop them all in one transaction, i.e. a single DuckLake commit
+    if tables:
+        drops = "".join(f"DROP TABLE IF EXISTS main.{name};" for (name,) in tables)
+        conn.execute(f"BEGIN;{drops}COMMIT;")
 
     conn.close()
@@ -1,7 +1,13 @@
 """Benchmark-specific fixtures and data generators."""
 
+import functools
+import math
+import os
+import random
+import uuid
 from dataclasses import dataclass
-from typing import Any, Iterator
+from typing import Any, Callable, Iterator
+from urllib.parse import urlparse
 
 import duckdb
 import pytest
@@ -45,15 +51,50 @@ def benchmark_duckdb_config() -> dict[str, Any]:
     }
 
 
-@pytest.fixture
-def benchmark_duckdb_conn(
+def _threads_for_rows(rows: int) -> int:
+    """Pick a DuckDB thread count proportional to the data volume.
+
+    Tiny datasets run single-threaded (thread startup costs more than the
+    work), larger ones scale with log10(rows) up to the available cores.
+    """
+    if rows < 10_000:
+        return 1
+    return min(os.cpu_count() or 4, max(2, int(math.log10(rows)) * 2))
+
+
+@functools.cache
+def _pg_connstr(url: str) -> str:
+    """Convert a SQLAlchemy-style Postgres URL into a libpq connection string."""
+    parsed = urlparse(url.replace("postgresql+psycopg2://", "postgresql://"))
+    return (
+        f"host={parsed.hostname} port={parsed.port} "
+        f"dbname={parsed.path.lstrip('/')} "
+        f"user={parsed.username} password={parsed.password}"
+    )
+
+
+def _configure_s3(conn: duckdb.DuckDBPyConnection, minio_container: Any) -> None:
+    """Point DuckDB's S3 settings at MinIO in a single multi-statement call."""
+    endpoint = minio_container.get_config()["endpoint"]
+    conn.execute(f"""
+        SET GLOBAL s3_endpoint='{endpoint}';
+        SET GLOBAL s3_access_key_id='{minio_container.access_key}';
+        SET GLOBAL s3_secret_access_key='{minio_container.secret_key}';
+        SET GLOBAL s3_use_ssl=false;
+        SET GLOBAL s3_url_style='path';
+    """)
+
+
+@pytest.fixture(scope="session")
+def _s3_configured_conn(
     minio_container: Any,
     postgres_container: Any,
     benchmark_duckdb_config: dict[str, Any],
 ) -> Iterator[duckdb.DuckDBPyConnection]:
-    """DuckDB connection optimized for benchmark performance.
+    """Session-wide DuckDB connection with DuckLake attached on MinIO.
 
-    Reuses the standard DuckDB setup but with performance tuning.
+    All network I/O (bucket check, extension loading, S3 settings, ATTACH)
+    happens once per session instead of once per benchmark.
     """
     conn = duckdb.connect(":memory:")
 
@@ -79,27 +120,11 @@ def benchmark_duckdb_conn(
         conn.execute("LOAD ducklake;")
 
         # Configure S3 settings for MinIO
-        conn.execute(f"""
-            SET s3_endpoint='{config["endpoint"]}';
-            SET s3_access_key_id='{minio_container.access_key}';
-            SET s3_secret_access_key='{minio_container.secret_key}';
-            SET s3_use_ssl=false;
-            SET s3_url_style='path';
-        """)
+        _configure_s3(conn, minio_container)
 
         # Attach DuckLake
         data_path = f"s3://{bucket}/ducklake-bench/"
-        from urllib.parse import urlparse
-
-        pg_url_full = postgres_container.get_connection_url().replace(
-            "postgresql+psycopg2://", "postgresql://"
-        )
-        parsed = urlparse(pg_url_full)
-        pg_connstr = (
-            f"host={parsed.hostname} port={parsed.port} "
-            f"dbname={parsed.path.lstrip('/')} "
-            f"user={parsed.username} password={parsed.password}"
-        )
+        pg_connstr = _pg_connstr(postgres_container.get_connection_url())
 
         conn.execute(f"""
             ATTACH 'ducklake:postgres:{pg_connstr}' AS ducklake (
@@ -123,77 +148,105 @@ def benchmark_duckdb_conn(
 
     yield conn
 
-    # Cleanup
+    conn.close()
+
+
+@pytest.fixture
+def benchmark_duckdb_conn(
+    request: pytest.FixtureRequest,
+    _s3_configured_conn: duckdb.DuckDBPyConnection,
+    benchmark_duckdb_config: dict[str, Any],
+) -> Iterator[duckdb.DuckDBPyConnection]:
+    """DuckDB connection optimized for benchmark performance.
+
+    Each benchmark gets its own cursor on the session connection (so TEMP
+    tables don't leak between tests) and its own DuckLake schema for isolation.
+    When the test uses ``benchmark_profile``, the thread count is sized to
+    the profile's row count.
+    """
+    conn = _s3_configured_conn.cursor()
+
+    threads = benchmark_duckdb_config["threads"]
+    if "benchmark_profile" in request.fixturenames:
+        threads = _threads_for_rows(request.getfixturevalue("benchmark_profile").rows)
+    conn.execute(f"SET threads={threads}")
+
+    schema = f"bench_{uuid.uuid4().hex[:8]}"
+    conn.execute(f"USE ducklake; CREATE SCHEMA {schema}; USE ducklake.{schema};")
+
+    yield conn
+
+    # Cleanup: one metadata transaction instead of a DROP per table
     try:
-        tables = conn.execute("""
-            SELECT table_name FROM information_schema.tables 
-            WHERE table_schema = 'main' 
-            AND table_type = 'BASE TABLE'
-        """).fetchall()
-
-        for (table_name,) in tables:
-            conn.execute(f"DROP TABLE IF EXISTS main.{table_name}")
+        conn.execute(f"USE ducklake; DROP SCHEMA IF EXISTS ducklake.{schema} CASCADE")
     except Exception:
         pass  # Ignore cleanup errors
 
     conn.close()
 
 
+def _amount_jitter(version: int) -> str:
+    """SQL for a deterministic per-row factor in [-0.1, 0.1], seeded by ``version``."""
+    return f"((hash(id, {version}) % 2001)::INTEGER - 1000) / 10000.0"
+
+
 class SyntheticDataGenerator:
     """Generate synthetic benchmark data with configurable characteristics."""
 
     def __init__(self, conn: duckdb.DuckDBPyConnection):
         self.conn = conn
+        self._cents_tables: set[str] = set()
+
+    def _latest_snapshot(self) -> int:
+        """Newest DuckLake snapshot id (0 if none), via a single-pass MAX()."""
+        result = self.conn.execute("SELECT MAX(snapshot_id) FROM ducklake.snapshots()").fetchone()
+        return result[0] if result and result[0] is not None else 0
 
     def create_fact_table(
         self,
         table_name: str,
         profile: DataProfile,
         snapshot_version: int = 0,
+        amount_as_cents: bool = False,
     ) -> int:
         """Create a fact table with synthetic data.
 
+        With ``amount_as_cents`` the amount is stored as ``amount_cents BIGINT``
+        (pure integer generation, no per-row DECIMAL cast). Keep the default
+        when DECIMAL handling is what the benchmark measures.
+
         Returns the snapshot ID after creating the table.
         """
-        # Create table with typical fact table structure
-        self.conn.execute(f"""
-            CREATE OR REPLACE TABLE {table_name} (
-                id BIGINT,
-                customer_id INTEGER,
-                product_id INTEGER,
-                region_id INTEGER,
-                order_date DATE,
-                amount DECIMAL(10,2),
-                quantity INTEGER,
-                version INTEGER DEFAULT {snapshot_version}
-            )
-        """)
-
-        # Generate data with controlled GROUP BY cardinality
-        # Use modulo to control how many distinct customer_id values exist
+        if amount_as_cents:
+            amount_expr = "(1000 + hash(i, 4) % 100000)::BIGINT as amount_cents"
+            self._cents_tables.add(table_name)
+        else:
+            amount_expr = "(10 + (hash(i, 4) % 99000) / 100)::DECIMAL(10,2) as amount"
+            self._cents_tables.discard(table_name)
+
+        # Single CTAS with typed columns: one DuckLake commit, and ids come
+        # straight from range() instead of a row_number() window.
+        # Values are hash(i, column) rather than random(), so data is reproducible.
+        # group_by_cardinality controls how many distinct customer_id values exist.
+        # Rows are written sorted by customer_id (the GROUP BY key of every benchmark
+        # query) so Parquet min/max stats let affected-key filters skip row groups.
         self.conn.execute(f"""
-            INSERT INTO {table_name}
+            CREATE OR REPLACE TABLE {table_name} AS
             SELECT
-                row_number() OVER () as id,
-                (random() * {profile.group_by_cardinality})::INTEGER as customer_id,
-                (random() * 1000)::INTEGER as product_id,
-                (random() * 50)::INTEGER as region_id,
-                DATE '2024-01-01' + (random() * 365)::INTEGER as order_date,
-                (random() * 1000 + 10)::DECIMAL(10,2) as amount,
-                (random() * 10 + 1)::INTEGER as quantity,
-                {snapshot_version} as version
-            FROM range({profile.rows})
+                i::BIGINT as id,
+                (hash(i) % {profile.group_by_cardinality})::INTEGER as customer_id,
+                (hash(i, 1) % 1000)::INTEGER as product_id,
+                (hash(i, 2) % 50)::INTEGER as region_id,
+                DATE '2024-01-01' + (hash(i, 3) % 365)::INTEGER as order_date,
+                {amount_expr},
+                (1 + hash(i, 5) % 10)::INTEGER as quantity,
+                {snapshot_version}::INTEGER as version
+            FROM range(1, {profile.rows + 1}) t(i)
+            ORDER BY customer_id
         """)
 
         # Get latest snapshot ID (DuckLake creates snapshots automatically on write)
-        snapshot_result = self.conn.execute("""
-            SELECT snapshot_id 
-            FROM ducklake.snapshots() 
-            ORDER BY snapshot_id DESC 
-            LIMIT 1
-        """).fetchone()
-        
-        return snapshot_result[0] if snapshot_result else 0
+        return self._latest_snapshot()
 
     def modify_fact_table(
         self,
@@ -208,25 +261,77 @@ class SyntheticDataGenerator:
         """
         # Update a percentage of rows
         num_affected = profile.affected_rows
+        jitter = _amount_jitter(new_snapshot_version)
+        if table_name in self._cents_tables:
+            amount_update = f"amount_cents = (amount_cents * (1 + {jitter}))::BIGINT"
+        else:
+            amount_update = f"amount = amount * (1 + {jitter})"
 
         self.conn.execute(f"""
             UPDATE {table_name}
             SET 
-                amount = amount * (1 + random() * 0.2 - 0.1),
-                quantity = quantity + (random() * 4 - 2)::INTEGER,
+                {amount_update},
+                quantity = quantity + (hash(id, {new_snapshot_version}, 1) % 5)::INTEGER - 2,
                 version = {new_snapshot_version}
             WHERE id <= {num_affected}
         """)
 
         # Get latest snapshot ID (DuckLake creates snapshots automatically on write)
-        snapshot_result = self.conn.execute("""
-            SELECT snapshot_id 
-            FROM ducklake.snapshots() 
-            ORDER BY snapshot_id DESC 
-            LIMIT 1
-        """).fetchone()
-        
-        return snapshot_result[0] if snapshot_result else 0
+        return self._latest_snapshot()
+
+    def modify_fact_table_returning_delta(
+        self,
+        table_name: str,
+        profile: DataProfile,
+        new_snapshot_version: int,
+    ) -> tuple[int, str]:
+        """Modify the same rows as modify_fact_table, materializing the delta first.
+
+        The per-row changes are written to a TEMP table ``{table_name}_delta``
+        (id, customer_id, amount_delta, quantity_delta) and then applied, so
+        benchmarks can compare re-running a query against maintaining its
+        result from the delta alone.
+
+        Returns (snapshot ID, delta table name).
+        """
+        delta_table = f"{table_name}_delta"
+        jitter = _amount_jitter(new_snapshot_version)
+        if table_name in self._cents_tables:
+            amount_column, amount_type = "amount_cents", "BIGINT"
+        else:
+            amount_column, amount_type = "amount", "DECIMAL(10,2)"
+
+        self.conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {delta_table} AS
+            SELECT
+                id,
+                customer_id,
+                ({amount_column} * {jitter})::{amount_type} as amount_delta,
+                (hash(id, {new_snapshot_version}, 1) % 5)::INTEGER - 2 as quantity_delta
+            FROM {table_name}
+            WHERE id <= {profile.affected_rows}
+        """)
+
+        self.conn.execute(f"""
+            UPDATE {table_name}
+            SET
+                {amount_column} = {table_name}.{amount_column} + d.amount_delta,
+                quantity = {table_name}.quantity + d.quantity_delta,
+                version = {new_snapshot_version}
+            FROM {delta_table} d
+            WHERE {table_name}.id = d.id
+        """)
+
+        # Get latest snapshot ID (DuckLake creates snapshots automatically on write)
+        return self._latest_snapshot(), delta_table
+
+    def create_fact_view(self, table_name: str, base_table: str) -> None:
+        """Expose a prebuilt fact table as ``table_name`` without copying its data.
+
+        Only for benchmarks that read the fact table; use create_fact_table when
+        the benchmark modifies it.
+        """
+        self.conn.execute(f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM {base_table}")
 
     def create_dimension_table(
         self,
@@ -238,36 +343,20 @@ class SyntheticDataGenerator:
 
         Returns the snapshot ID.
         """
+        # Single CTAS: one DuckLake commit instead of CREATE + INSERT
         self.conn.execute(f"""
-            CREATE OR REPLACE TABLE {table_name} (
-                id INTEGER,
-                name VARCHAR,
-                category VARCHAR,
-                status VARCHAR,
-                version INTEGER DEFAULT {snapshot_version}
-            )
-        """)
-
-        self.conn.execute(f"""
-            INSERT INTO {table_name}
+            CREATE OR REPLACE TABLE {table_name} AS
             SELECT
-                i as id,
+                i::INTEGER as id,
                 'Item_' || i as name,
                 'Category_' || (i % 10) as category,
                 CASE WHEN i % 5 = 0 THEN 'active' ELSE 'inactive' END as status,
-                {snapshot_version} as version
+                {snapshot_version}::INTEGER as version
             FROM range({num_rows}) t(i)
         """)
 
         # Get latest snapshot ID (DuckLake creates snapshots automatically on write)
-        snapshot_result = self.conn.execute("""
-            SELECT snapshot_id 
-            FROM ducklake.snapshots() 
-            ORDER BY snapshot_id DESC 
-            LIMIT 1
-        """).fetchone()
-        
-        return snapshot_result[0] if snapshot_result else 0
+        return self._latest_snapshot()
 
     def modify_dimension_table(
         self,
@@ -279,23 +368,59 @@ class SyntheticDataGenerator:
 
         Returns the new snapshot ID.
         """
-        self.conn.execute(f"""
+        # Sample ids up front (seeded for reproducible delta sizes) so the
+        # UPDATE touches only the affected keys instead of a random() per row
+        num_rows = self.conn.execute(f"SELECT count(*) FROM {table_name}").fetchone()[0]
+        k = max(1, int(num_rows * pct_affected))
+        ids = random.Random(new_snapshot_version).sample(range(num_rows), min(k, num_rows))
+
+        self.conn.execute(
+            f"""
             UPDATE {table_name}
             SET 
                 status = CASE WHEN status = 'active' THEN 'inactive' ELSE 'active' END,
-                version = {new_snapshot_version}
-            WHERE random() < {pct_affected}
-        """)
+                version = ?
+            WHERE id IN (SELECT UNNEST(?::INTEGER[]))
+        """,
+            [new_snapshot_version, ids],
+        )
 
         # Get latest snapshot ID (DuckLake creates snapshots automatically on write)
-        snapshot_result = self.conn.execute("""
-            SELECT snapshot_id 
-            FROM ducklake.snapshots() 
-            ORDER BY snapshot_id DESC 
-            LIMIT 1
-        """).fetchone()
-        
-        return snapshot_result[0] if snapshot_result else 0
+        return self._latest_snapshot()
+
+
+@pytest.fixture(scope="session")
+def prebuilt_fact_tables(
+    _s3_configured_conn: duckdb.DuckDBPyConnection,
+) -> Iterator[Callable[..., str]]:
+    """Session cache of read-only fact tables, built once per (profile, layout).
+
+    Yields ``get(profile, amount_as_cents=False)`` returning the fully qualified
+    name of the shared table. Benchmarks that only read their source expose it
+    with ``SyntheticDataGenerator.create_fact_view`` instead of regenerating it.
+    """
+    conn = _s3_configured_conn.cursor()
+    schema = f"bench_base_{uuid.uuid4().hex[:8]}"
+    conn.execute(f"USE ducklake; CREATE SCHEMA {schema}; USE ducklake.{schema};")
+    generator = SyntheticDataGenerator(conn)
+    built: dict[tuple[str, bool], str] = {}
+
+    def get(profile: DataProfile, amount_as_cents: bool = False) -> str:
+        key = (profile.name, amount_as_cents)
+        if key not in built:
+            table_name = f"fact_{profile.name}{'_cents' if amount_as_cents else ''}"
+            generator.create_fact_table(table_name, profile, 0, amount_as_cents=amount_as_cents)
+            built[key] = f"ducklake.{schema}.{table_name}"
+        return built[key]
+
+    yield get
+
+    try:
+        conn.execute(f"USE ducklake; DROP SCHEMA IF EXISTS ducklake.{schema} CASCADE")
+    except Exception:
+        pass  # Ignore cleanup errors
+
+    conn.close()
 
 
 @pytest.fixture
@@ -306,6 +431,28 @@ def data_generator(
     return SyntheticDataGenerator(benchmark_duckdb_conn)
 
 
+@pytest.fixture
+def fact_delta(
+    benchmark_duckdb_conn: duckdb.DuckDBPyConnection,
+    data_generator: SyntheticDataGenerator,
+    benchmark_profile: DataProfile,
+) -> tuple[duckdb.DuckDBPyConnection, str, str, Any]:
+    """Fact table modified via an explicit delta.
+
+    Returns (connection, fact table name, delta table name, SUM(amount) taken
+    before the delta was applied).
+    """
+    table_name = "sales_fact"
+    data_generator.create_fact_table(table_name, benchmark_profile, 0)
+    (sum_before,) = benchmark_duckdb_conn.execute(
+        f"SELECT SUM(amount) FROM {table_name}"
+    ).fetchone()
+    _, delta_table = data_generator.modify_fact_table_returning_delta(
+        table_name, benchmark_profile, 1
+    )
+    return benchmark_duckdb_conn, table_name, delta_table, sum_before
+
+
 @pytest.fixture(
     params=[
         pytest.param("tiny", marks=pytest.mark.quick),
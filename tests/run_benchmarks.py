@@ -70,18 +70,32 @@ def compare_benchmarks(baseline: str, current: str = "0001") -> dict[str, Any]:
     ]
 
     print(f"Comparing: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    print(result.stdout)
-    if result.stderr:
-        print(result.stderr, file=sys.stderr)
+    # Stream stdout line by line (stderr goes straight to the terminal)
+    output_lines = []
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, bufsize=1) as proc:
+        for line in proc.stdout:
+            print(line, end="")
+            output_lines.append(line)
+        returncode = proc.wait()
 
     return {
-        "exit_code": result.returncode,
-        "output": result.stdout,
+        "exit_code": returncode,
+        "output": "".join(output_lines),
     }
 
 
+def _report_row(bench: dict[str, Any]) -> str:
+    """Format one pytest-benchmark entry as a markdown table row.
+
+    The stats dict is looked up once and ops/sec is derived from the median.
+    """
+    stats = bench.get("stats", {})
+    median = stats.get("median", 0.0)
+    ops_sec = 1.0 / median if median > 0 else 0.0
+    stddev = stats.get("stddev", 0.0)
+    return f"| `{bench.get('name', 'unknown')}` | {median:.4f} | {ops_sec:.2f} | {stddev:.4f} |"
+
+
 def generate_markdown_report(baseline: str = "main") -> str:
     """Generate markdown report for PR comments.
 
@@ -120,14 +134,8 @@ def generate_markdown_report(baseline: str = "main") -> str:
     report.append("| Test | Median (s) | Ops/sec | Stddev |")
     report.append("|------|-----------|---------|--------|")
 
-    for bench in benchmarks:
-        name = bench.get("name", "unknown")
-        stats = bench.get("stats", {})
-        median = stats.get("median", 0.0)
-        ops_sec = 1.0 / median if median > 0 else 0.0
-        stddev = stats.get("stddev", 0.0)
-
-        report.append(f"| `{name}` | {median:.4f} | {ops_sec:.2f} | {stddev:.4f} |")
+    # One comprehension builds every row; the report is joined once below
+    report.extend([_report_row(bench) for bench in benchmarks])
 
     report.append(f"\n**Total benchmarks:** {len(benchmarks)}")
     report.append(f"**Baseline:** `{baseline}`")
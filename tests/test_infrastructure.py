@@ -75,8 +75,8 @@ def test_duckdb_s3_integration(duckdb_conn: Any, minio_client: Any) -> None:
     assert result[0] == 10
 
     # Verify data files exist in MinIO under the ducklake-data path
-    objects = list(client.list_objects(bucket, prefix="ducklake-data/", recursive=True))
-    assert len(objects) > 0, "Expected DuckLake to write data files to S3"
+    objects = client.list_objects(bucket, prefix="ducklake-data/", recursive=True)
+    assert next(objects, None) is not None, "Expected DuckLake to write data files to S3"
 
 
 def test_ducklake_snapshots(duckdb_conn: Any) -> None:
@@ -90,23 +90,17 @@ def test_ducklake_snapshots(duckdb_conn: Any) -> None:
     """)
 
     # Get initial snapshot after table creation
-    first_snapshot = duckdb_conn.execute("""
-        SELECT snapshot_id 
-        FROM ducklake.snapshots() 
-        ORDER BY snapshot_id DESC 
-        LIMIT 1
-    """).fetchone()[0]
+    first_snapshot = duckdb_conn.execute(
+        "SELECT MAX(snapshot_id) FROM ducklake.snapshots()"
+    ).fetchone()[0]
 
     # Insert initial data
     duckdb_conn.execute("INSERT INTO orders VALUES (1, 100.00), (2, 200.00);")
 
     # Get snapshot after first insert
-    second_snapshot = duckdb_conn.execute("""
-        SELECT snapshot_id 
-        FROM ducklake.snapshots() 
-        ORDER BY snapshot_id DESC 
-        LIMIT 1
-    """).fetchone()[0]
+    second_snapshot = duckdb_conn.execute(
+        "SELECT MAX(snapshot_id) FROM ducklake.snapshots()"
+    ).fetchone()[0]
 
     assert second_snapshot > first_snapshot
 
@@ -114,12 +108,9 @@ def test_ducklake_snapshots(duckdb_conn: Any) -> None:
     duckdb_conn.execute("INSERT INTO orders VALUES (3, 300.00);")
 
     # Get the new snapshot after second insert
-    third_snapshot = duckdb_conn.execute("""
-        SELECT snapshot_id 
-        FROM ducklake.snapshots() 
-        ORDER BY snapshot_id DESC 
-        LIMIT 1
-    """).fetchone()[0]
+    third_snapshot = duckdb_conn.execute(
+        "SELECT MAX(snapshot_id) FROM ducklake.snapshots()"
+    ).fetchone()[0]
 
     assert third_snapshot > second_snapshot
 
@@ -134,3 +125,13 @@ def test_ducklake_snapshots(duckdb_conn: Any) -> None:
     # Current table should have all data
     count_current = duckdb_conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
     assert count_current == 3
+
+
+def test_benchmark_cursor_uses_parquet_metadata_cache(benchmark_duckdb_conn: Any) -> None:
+    """Test that benchmark cursors inherit the session's global Parquet footer cache."""
+    # Each benchmark runs on a cursor (a separate session) of the configured connection
+    enabled = benchmark_duckdb_conn.execute(
+        "SELECT current_setting('parquet_metadata_cache')"
+    ).fetchone()[0]
+
+    assert enabled is True
@@ -43,6 +43,17 @@ class TestExtractSourceTables:
         assert "sales" in tables
         assert "customers" in tables
 
+    def test_extract_excludes_cte_names(self) -> None:
+        """Test that CTE names are not reported as source tables."""
+        query = """
+        WITH recent AS (SELECT * FROM orders WHERE order_date > '2024-01-01')
+        SELECT r.customer_id, COUNT(*) FROM recent r JOIN customers c ON r.customer_id = c.id
+        GROUP BY r.customer_id
+        """
+        tables = extract_source_tables(query)
+
+        assert tables == ["customers", "orders"]
+
 
 class TestDependencyGraph:
     """Test dependency graph and cycle detection."""
@@ -83,6 +94,20 @@ class TestDependencyGraph:
         with pytest.raises(ValueError, match="Circular dependency"):
             graph.add_table("a", ["a"])
 
+    def test_replace_dependencies(self) -> None:
+        """Test that replacing a table's dependencies drops its old reachability."""
+        graph = DependencyGraph()
+
+        graph.add_table("b", ["a"])
+        graph.add_table("c", ["b"])
+        graph.add_table("b", [])
+
+        # a is no longer upstream of b or c, so it may now depend on c
+        graph.add_table("a", ["c"])
+
+        with pytest.raises(ValueError, match="Circular dependency"):
+            graph.add_table("b", ["a"])
+
     def test_topological_sort_simple(self) -> None:
         """Test topological sorting."""
         graph = DependencyGraph()
@@ -115,6 +140,57 @@ class TestDependencyGraph:
         assert order.index("b") < order.index("d")
         assert order.index("c") < order.index("d")
 
+    def test_topological_sort_deterministic(self) -> None:
+        """Test that independent tables are ordered by name, not insertion order."""
+        graph = DependencyGraph()
+
+        graph.add_table("z", [])
+        graph.add_table("m", ["z"])
+        graph.add_table("a", [])
+
+        assert graph.topological_sort() == ["a", "z", "m"]
+
+    def test_topological_sort_tracks_changes(self) -> None:
+        """Test that repeated sorts reflect tables added and removed in between."""
+        graph = DependencyGraph()
+
+        graph.add_table("b", ["a"])
+        graph.add_table("a", [])
+
+        order = graph.topological_sort()
+        order.append("mutated")
+        assert graph.topological_sort() == ["a", "b"]
+
+        graph.add_table("c", ["b"])
+        assert graph.topological_sort() == ["a", "b", "c"]
+
+        graph.remove_table("b")
+        assert graph.topological_sort() == ["a", "c"]
+
+    def test_add_tables_bulk(self) -> None:
+        """Test bulk insertion in any order, with cycles reported as a path."""
+        graph = DependencyGraph()
+
+        graph.add_tables([("c", ["b"]), ("b", ["a"]), ("a", [])])
+        assert graph.topological_sort() == ["a", "b", "c"]
+
+        with pytest.raises(ValueError, match="Circular dependency detected: a -> c -> b -> a"):
+            graph.add_tables([("d", ["c"]), ("a", ["c"])])
+
+        # A rejected batch leaves the graph untouched
+        assert "d" not in graph.graph
+        graph.add_table("d", ["c"])
+
+    def test_topological_sort_chain(self) -> None:
+        """Test sorting a linear chain, including a non-dynamic source at its root."""
+        graph = DependencyGraph()
+
+        graph.add_table("c", ["b"])
+        graph.add_table("b", ["a"])
+        graph.add_table("a", ["sales"])
+
+        assert graph.topological_sort() == ["a", "b", "c"]
+
     def test_remove_table(self) -> None:
         """Test removing a table from the graph."""
         graph = DependencyGraph()
@@ -1,85 +1,87 @@
 """Test dynamic table refresh logic."""
 
-from typing import Any, Iterator
+from datetime import date
+from typing import Any
 import pytest
 from dynamic_tables.refresh import DynamicTableRefresher
 from dynamic_tables.parser import DynamicTableDefinition
 
+# (product_id, amount, sale_date) rows loaded into the sample sales table
+_SALES_ROWS = [
+    (1, 100.0, date(2024, 1, 1)),
+    (1, 150.0, date(2024, 1, 2)),
+    (2, 200.0, date(2024, 1, 1)),
+    (2, 250.0, date(2024, 1, 2)),
+]
+
+# Shared definition queries: one string object per shape, so every test hits the
+# same parse/extraction cache entry (and reuses the string's cached hash)
+_TOTAL_SALES_SQL = "SELECT product_id, SUM(amount) as total_sales FROM sales GROUP BY product_id"
+_TOTAL_SQL = "SELECT product_id, SUM(amount) as total FROM sales GROUP BY product_id"
+
+
+def _table_exists(conn: Any, name: str) -> bool:
+    """Probe the DuckDB catalog for a table by name."""
+    query = "SELECT 1 FROM duckdb_tables() WHERE table_name = ? LIMIT 1"
+    return conn.execute(query, [name]).fetchone() is not None
+
 
 class TestDynamicTableRefresh:
     """Test full refresh functionality."""
 
+    # Definitions reused across tests, built (and parsed) once at import. They are
+    # frozen, so sharing one instance between tests is safe.
+    _SALES_SUMMARY_DEF = DynamicTableDefinition.create(
+        name="sales_summary", schema_name="main", query_sql=_TOTAL_SALES_SQL
+    )
+    _SALES_SUMMARY_TOTAL_DEF = DynamicTableDefinition.create(
+        name="sales_summary", schema_name="main", query_sql=_TOTAL_SQL
+    )
+
     @pytest.fixture
     def refresher(self, metadata_store: Any, duckdb_conn: Any) -> DynamicTableRefresher:
         """Create a refresher instance."""
         return DynamicTableRefresher(metadata_store, duckdb_conn)
 
     @pytest.fixture
-    def sample_source_data(self, duckdb_conn: Any) -> Iterator[None]:
-        """Create sample source tables with data."""
-        # Drop if exists first
-        # Drop any existing sales table (DDL - no transaction)
-        try:
-            duckdb_conn.execute("DROP TABLE IF EXISTS sales")
-        except Exception:
-            pass
-
-        # Create table (DDL - no transaction)
-        duckdb_conn.execute("""
-            CREATE TABLE sales (
-                product_id INTEGER,
-                amount DECIMAL(10,2),
-                sale_date DATE
-            );
-        """)
-
-        # Insert data (DML - in transaction)
-        duckdb_conn.execute("BEGIN TRANSACTION")
-        duckdb_conn.execute("""
-            INSERT INTO sales VALUES
-                (1, 100.00, '2024-01-01'),
-                (1, 150.00, '2024-01-02'),
-                (2, 200.00, '2024-01-01'),
-                (2, 250.00, '2024-01-02');
-        """)
-        duckdb_conn.execute("COMMIT")
-
-        yield
+    def sample_source_data(self, duckdb_conn: Any) -> None:
+        """Create sample source tables with data.
 
-        # Cleanup (DDL - no transaction)
-        try:
-            duckdb_conn.execute("DROP TABLE IF EXISTS sales")
-        except Exception:
-            pass
+        No DROP before or after: duckdb_conn drops every table in main after each
+        test, so sales never survives into the next one.
+        """
+        # Bind the rows as column arrays: one statement and one DuckLake commit,
+        # with no VALUES literal to parse
+        duckdb_conn.execute(
+            """
+            CREATE TABLE sales AS
+            SELECT
+                UNNEST(?::INTEGER[]) AS product_id,
+                UNNEST(?::DOUBLE[]) AS amount,
+                UNNEST(?::DATE[]) AS sale_date
+        """,
+            [list(column) for column in zip(*_SALES_ROWS)],
+        )
 
-    def test_create_dynamic_table(self, refresher: Any, sample_source_data: Any) -> None:
+    def test_create_dynamic_table(self, refresher: Any) -> None:
         """Test creating a dynamic table."""
-        definition = DynamicTableDefinition.create(
-            name="sales_summary",
-            schema_name="main",
-            query_sql="SELECT product_id, SUM(amount) as total_sales FROM sales GROUP BY product_id",
-        )
-        refresher.create_dynamic_table(definition)
+        refresher.create_dynamic_table(self._SALES_SUMMARY_DEF)
 
         # Verify it's in metadata
         tables = refresher.list_tables()
         assert len(tables) == 1
         assert tables[0]["name"] == "sales_summary"
 
-    def test_create_duplicate_table(self, refresher: Any, sample_source_data: Any) -> None:
+    def test_create_duplicate_table(self, refresher: Any) -> None:
         """Test that creating duplicate table raises error."""
-        definition = DynamicTableDefinition.create(
-            name="sales_summary",
-            schema_name="main",
-            query_sql="SELECT product_id, SUM(amount) as total_sales FROM sales GROUP BY product_id",
-        )
+        definition = self._SALES_SUMMARY_DEF
         refresher.create_dynamic_table(definition)
 
         # Try to create again
         with pytest.raises(ValueError, match="already exists"):
             refresher.create_dynamic_table(definition)
 
-    def test_create_circular_dependency(self, refresher: Any, sample_source_data: Any) -> None:
+    def test_create_circular_dependency(self, refresher: Any) -> None:
         """Test that circular dependencies are detected."""
         # Create table A depending on B
         definition_a = DynamicTableDefinition.create(
@@ -111,39 +113,36 @@ class TestDynamicTableRefresh:
 
         assert result["status"] == "SUCCESS"
         assert result["rows_affected"] == 2  # 2 products
-        assert result["duration_ms"] > 0
+        assert isinstance(result["duration_ms"], int)
+        assert result["duration_ms"] >= 0
 
-        # Verify data
-        rows = duckdb_conn.execute("""
-            SELECT product_id, total_sales, sale_count
-            FROM sales_summary
-            ORDER BY product_id
-        """).fetchall()
+        # The recorded history carries the same duration and a consistent time window
+        history = refresher.metadata.latest_history("sales_summary")
+        assert history["status"] == "SUCCESS"
+        assert history["duration_ms"] == result["duration_ms"]
+        assert history["completed_at"] >= history["started_at"]
 
-        assert len(rows) == 2
-        assert rows[0] == (1, 250.00, 2)  # Product 1: 100 + 150
-        assert rows[1] == (2, 450.00, 2)  # Product 2: 200 + 250
+        # Verify data (keyed by product_id, so the query needs no ORDER BY)
+        rows = duckdb_conn.execute(
+            "SELECT product_id, total_sales, sale_count FROM sales_summary"
+        ).fetchall()
+        by_product = {row[0]: row for row in rows}
+
+        assert len(by_product) == 2
+        assert by_product[1] == (1, 250.00, 2)  # Product 1: 100 + 150
+        assert by_product[2] == (2, 450.00, 2)  # Product 2: 200 + 250
 
     def test_refresh_updates_existing_data(
         self, refresher: Any, duckdb_conn: Any, sample_source_data: Any
     ) -> None:
         """Test that refresh replaces existing data."""
-        definition = DynamicTableDefinition.create(
-            name="sales_summary",
-            schema_name="main",
-            query_sql="SELECT product_id, SUM(amount) as total_sales FROM sales GROUP BY product_id",
-        )
-        refresher.create_dynamic_table(definition)
+        refresher.create_dynamic_table(self._SALES_SUMMARY_DEF)
 
         # First refresh
         refresher.refresh_tables(["sales_summary"])
 
-        # Add more sales (with transaction)
-        duckdb_conn.execute("BEGIN TRANSACTION")
-        duckdb_conn.execute("""
-            INSERT INTO sales VALUES (1, 75.00, '2024-01-03')
-        """)
-        duckdb_conn.execute("COMMIT")
+        # Add more sales (single statement, auto-committed)
+        duckdb_conn.execute("INSERT INTO sales VALUES (?, ?, ?)", [1, 75.0, date(2024, 1, 3)])
 
         # Refresh again
         result = refresher.refresh_tables(["sales_summary"])[0]
@@ -160,6 +159,25 @@ class TestDynamicTableRefresh:
         assert len(rows) == 1
         assert rows[0][1] == 325.00  # 100 + 150 + 75
 
+    def test_refresh_skipped_when_sources_unchanged(
+        self, refresher: Any, sample_source_data: Any
+    ) -> None:
+        """Test that a refresh with no source changes since the last one is skipped."""
+        refresher.create_dynamic_table(self._SALES_SUMMARY_DEF)
+        assert refresher.refresh_tables(["sales_summary"])[0]["status"] == "SUCCESS"
+
+        # Nothing was committed to DuckLake in between
+        result = refresher.refresh_tables(["sales_summary"])[0]
+
+        assert result["status"] == "SKIPPED"
+        assert result["rows_affected"] == 0
+
+        # The skip is recorded in refresh_history
+        history = refresher.metadata.latest_history("sales_summary")
+        assert history["status"] == "SKIPPED"
+        assert history["rows_affected"] == 0
+        assert history["completed_at"] >= history["started_at"]
+
     def test_refresh_nonexistent_table(self, refresher: Any) -> None:
         """Test refreshing a table that doesn't exist."""
         with pytest.raises(ValueError, match="does not exist"):
@@ -174,7 +192,7 @@ class TestDynamicTableRefresh:
             DynamicTableDefinition.create(
                 name="sales_by_product",
                 schema_name="main",
-                query_sql="SELECT product_id, SUM(amount) as total FROM sales GROUP BY product_id",
+                query_sql=_TOTAL_SQL,
             )
         )
 
@@ -201,45 +219,27 @@ class TestDynamicTableRefresh:
         assert results[1]["status"] == "SUCCESS"
 
         # Verify final data in dependent table
-        rows = duckdb_conn.execute("""
-            SELECT product_id, total
-            FROM top_products
-            ORDER BY product_id
-        """).fetchall()
+        totals = dict(duckdb_conn.execute("SELECT product_id, total FROM top_products").fetchall())
 
-        assert len(rows) == 2
-        assert rows[0][0] == 1  # Product 1 total: 250
-        assert rows[1][0] == 2  # Product 2 total: 450
+        assert totals == {1: 250, 2: 450}  # Both products pass the total > 200 filter
 
     def test_drop_table(self, refresher: Any, duckdb_conn: Any, sample_source_data: Any) -> None:
         """Test dropping a dynamic table."""
-        refresher.create_dynamic_table(
-            DynamicTableDefinition.create(
-                name="sales_summary",
-                schema_name="main",
-                query_sql="SELECT product_id, SUM(amount) as total FROM sales GROUP BY product_id",
-            )
-        )
+        refresher.create_dynamic_table(self._SALES_SUMMARY_TOTAL_DEF)
         refresher.refresh_tables(["sales_summary"])
+        assert refresher.table_exists("sales_summary")
+        assert _table_exists(duckdb_conn, "sales_summary")
 
         # Drop the table
         refresher.drop_dynamic_table("sales_summary")
 
         # Verify it's gone from metadata
-        tables = refresher.list_tables()
-        assert len(tables) == 0
+        assert not refresher.table_exists("sales_summary")
 
         # Verify table doesn't exist in DuckDB
-        table_exists = duckdb_conn.execute("""
-            SELECT COUNT(*) FROM information_schema.tables 
-            WHERE table_name = 'sales_summary'
-        """).fetchone()[0]
-
-        assert table_exists == 0
+        assert not _table_exists(duckdb_conn, "sales_summary")
 
-    def test_cannot_drop_table_with_dependents(
-        self, refresher: Any, sample_source_data: Any
-    ) -> None:
+    def test_cannot_drop_table_with_dependents(self, refresher: Any) -> None:
         """Test that dropping a table with dependents fails."""
         # Create parent table
         refresher.create_dynamic_table(
@@ -261,92 +261,61 @@ class TestDynamicTableRefresh:
 
     def test_refresh_history_recorded(self, refresher: Any, sample_source_data: Any) -> None:
         """Test that refresh history is properly recorded."""
-        refresher.create_dynamic_table(
-            DynamicTableDefinition.create(
-                name="sales_summary",
-                schema_name="main",
-                query_sql="SELECT product_id, SUM(amount) as total FROM sales GROUP BY product_id",
-            )
-        )
+        refresher.create_dynamic_table(self._SALES_SUMMARY_TOTAL_DEF)
         refresher.refresh_tables(["sales_summary"])
 
         # Check history
-        cursor = refresher.metadata.conn.cursor()
-        cursor.execute("""
-            SELECT dynamic_table, status, strategy_used, rows_affected
-            FROM refresh_history
-            WHERE dynamic_table = 'sales_summary'
-        """)
-
-        row = cursor.fetchone()
+        row = refresher.metadata.latest_history("sales_summary")
         assert row is not None
-        assert row[0] == "sales_summary"
-        assert row[1] == "SUCCESS"
-        assert row[2] == "FULL"
-        assert row[3] == 2
+        assert row["dynamic_table"] == "sales_summary"
+        assert row["status"] == "SUCCESS"
+        assert row["strategy_used"] == "FULL"
+        assert row["rows_affected"] == 2
 
     def test_snapshots_captured_during_refresh(
-        self, refresher: Any, duckdb_conn: Any, sample_source_data: Any
+        self, refresher: Any, duckdb_conn: Any, meta_cursor: Any, sample_source_data: Any
     ) -> None:
         """Test that source snapshots are captured before query execution."""
         # Get current snapshot of sales table before creating dynamic table
-        initial_snapshot = duckdb_conn.execute("""
-            SELECT snapshot_id 
-            FROM ducklake.snapshots() 
-            ORDER BY snapshot_id DESC 
-            LIMIT 1
-        """).fetchone()[0]
+        initial_snapshot = duckdb_conn.execute(
+            "SELECT MAX(snapshot_id) FROM ducklake.snapshots()"
+        ).fetchone()[0]
 
-        refresher.create_dynamic_table(
-            DynamicTableDefinition.create(
-                name="sales_summary",
-                schema_name="main",
-                query_sql="SELECT product_id, SUM(amount) as total FROM sales GROUP BY product_id",
-            )
-        )
+        refresher.create_dynamic_table(self._SALES_SUMMARY_TOTAL_DEF)
         refresher.refresh_tables(["sales_summary"])
 
-        # Verify snapshots were captured in source_snapshots table
-        cursor = refresher.metadata.conn.cursor()
-        cursor.execute("""
-            SELECT source_table, last_snapshot
-            FROM source_snapshots
-            WHERE dynamic_table = 'sales_summary'
+        # Read the captured source_snapshots rows together with the latest
+        # refresh_history snapshots in one metadata round trip
+        meta_cursor.execute("""
+            SELECT ss.source_table, ss.last_snapshot, rh.source_snapshots
+            FROM source_snapshots ss
+            LEFT JOIN LATERAL (
+                SELECT source_snapshots
+                FROM refresh_history
+                WHERE dynamic_table = ss.dynamic_table
+                ORDER BY started_at DESC
+                LIMIT 1
+            ) rh ON TRUE
+            WHERE ss.dynamic_table = 'sales_summary'
         """)
 
-        snapshots = cursor.fetchall()
+        snapshots = meta_cursor.fetchall()
         assert len(snapshots) == 1
         assert snapshots[0][0] == "sales"  # source_table
         assert snapshots[0][1] >= initial_snapshot  # last_snapshot should be >= initial
 
         # Verify snapshots were recorded in refresh_history
-        cursor.execute("""
-            SELECT source_snapshots
-            FROM refresh_history
-            WHERE dynamic_table = 'sales_summary'
-            ORDER BY started_at DESC
-            LIMIT 1
-        """)
-
-        history_row = cursor.fetchone()
-        assert history_row is not None
-        source_snapshots_json = history_row[0]
+        source_snapshots_json = snapshots[0][2]
         assert source_snapshots_json is not None
         assert "sales" in source_snapshots_json
         assert source_snapshots_json["sales"] >= initial_snapshot
 
     def test_snapshots_tracked_for_dependent_tables(
-        self, refresher: Any, duckdb_conn: Any, sample_source_data: Any
+        self, refresher: Any, duckdb_conn: Any, meta_cursor: Any, sample_source_data: Any
     ) -> None:
         """Test that snapshots are tracked for dynamic tables that depend on other dynamic tables."""
         # Create first-level dynamic table
-        refresher.create_dynamic_table(
-            DynamicTableDefinition.create(
-                name="sales_summary",
-                schema_name="main",
-                query_sql="SELECT product_id, SUM(amount) as total FROM sales GROUP BY product_id",
-            )
-        )
+        refresher.create_dynamic_table(self._SALES_SUMMARY_TOTAL_DEF)
         refresher.refresh_tables(["sales_summary"])
 
         # Create second-level dynamic table that depends on sales_summary
@@ -360,15 +329,14 @@ class TestDynamicTableRefresh:
         refresher.refresh_tables(["high_value_products"])
 
         # Verify that high_value_products has snapshots for both sales_summary and sales
-        cursor = refresher.metadata.conn.cursor()
-        cursor.execute("""
+        meta_cursor.execute("""
             SELECT source_table, last_snapshot
             FROM source_snapshots
             WHERE dynamic_table = 'high_value_products'
             ORDER BY source_table
         """)
 
-        snapshots = cursor.fetchall()
+        snapshots = meta_cursor.fetchall()
         # Should have snapshots for both sales (transitive) and sales_summary (direct)
         assert len(snapshots) == 2
         assert snapshots[0][0] == "sales"
@@ -381,14 +349,14 @@ class TestDynamicTableRefresh:
         When C refreshes, it must read A at the same snapshot that B used,
         otherwise the data from A and B could be inconsistent.
         """
-        # Create base table A
-        duckdb_conn.execute("""
-            CREATE TABLE orders (
-                order_id INTEGER,
-                amount DECIMAL(10,2)
-            )
-        """)
-        duckdb_conn.execute("INSERT INTO orders VALUES (1, 100), (2, 200)")
+        # Create base table A with its initial data in one statement
+        duckdb_conn.execute(
+            """
+            CREATE TABLE orders AS
+            SELECT UNNEST(?::INTEGER[]) AS order_id, UNNEST(?::DOUBLE[]) AS amount
+        """,
+            [[1, 2], [100, 200]],
+        )
 
         # Create dynamic table B that depends on A
         refresher.create_dynamic_table(
@@ -416,18 +384,19 @@ class TestDynamicTableRefresh:
                 SELECT 
                     os.order_count,
                     os.total_amount,
-                    COUNT(*) as actual_count,
-                    SUM(o.amount) as actual_amount
+                    o.actual_count,
+                    o.actual_amount
                 FROM order_summary os
-                CROSS JOIN orders o
-                GROUP BY os.order_count, os.total_amount
+                CROSS JOIN (
+                    SELECT COUNT(*) as actual_count, SUM(amount) as actual_amount FROM orders
+                ) o
             """,
             )
         )
 
         # Insert more data into A BEFORE refreshing C
         # This creates the scenario where A has progressed but B hasn't been refreshed yet
-        duckdb_conn.execute("INSERT INTO orders VALUES (3, 300)")
+        duckdb_conn.execute("INSERT INTO orders VALUES (?, ?)", [3, 300.0])
 
         # Refresh C - it should use the SAME snapshot of A that B used,
         # not the current state of A
@@ -451,9 +420,6 @@ class TestDynamicTableRefresh:
             "total_amount should match actual_amount (snapshot isolation)"
         )
 
-        # Cleanup
-        duckdb_conn.execute("DROP TABLE IF EXISTS orders")
-
     def test_incremental_refresh_affected_keys(self, refresher: Any, duckdb_conn: Any) -> None:
         """Test incremental refresh using affected keys strategy (Phase 2).
 
@@ -465,26 +431,17 @@ class TestDynamicTableRefresh:
         5. Do incremental refresh
         6. Verify only affected customers were recomputed
         """
-        # Create source table with orders
-        duckdb_conn.execute("DROP TABLE IF EXISTS orders")
-        duckdb_conn.execute("""
-            CREATE TABLE orders (
-                order_id INTEGER,
-                customer_id INTEGER,
-                amount DECIMAL(10,2)
-            )
-        """)
-
-        # Insert initial data
-        duckdb_conn.execute("BEGIN TRANSACTION")
-        duckdb_conn.execute("""
-            INSERT INTO orders VALUES
-                (1, 100, 50.00),
-                (2, 100, 75.00),
-                (3, 200, 100.00),
-                (4, 300, 25.00)
-        """)
-        duckdb_conn.execute("COMMIT")
+        # Create source table with orders and its initial data in one statement
+        duckdb_conn.execute(
+            """
+            CREATE TABLE orders AS
+            SELECT
+                UNNEST(?::INTEGER[]) AS order_id,
+                UNNEST(?::INTEGER[]) AS customer_id,
+                UNNEST(?::DOUBLE[]) AS amount
+        """,
+            [[1, 2, 3, 4], [100, 100, 200, 300], [50, 75, 100, 25]],
+        )
 
         # Create dynamic table that aggregates by customer_id
         refresher.create_dynamic_table(
@@ -519,13 +476,11 @@ class TestDynamicTableRefresh:
 
         # Now UPDATE order #2: change customer from 100 to 400
         # This affects TWO customers: 100 (loses an order) and 400 (gains an order)
-        duckdb_conn.execute("BEGIN TRANSACTION")
         duckdb_conn.execute("""
             UPDATE orders 
             SET customer_id = 400 
             WHERE order_id = 2
         """)
-        duckdb_conn.execute("COMMIT")
 
         # Incremental refresh - should only recompute customers 100 and 400
         # (not customers 200 or 300)
@@ -545,22 +500,11 @@ class TestDynamicTableRefresh:
         assert results[3] == (400, 1, 75.00)  # Gained order #2
 
         # Verify that refresh strategy was INCREMENTAL (not FULL)
-        cursor = refresher.metadata.conn.cursor()
-        cursor.execute("""
-            SELECT strategy_used, affected_keys_count
-            FROM refresh_history 
-            WHERE dynamic_table = 'customer_metrics'
-            ORDER BY started_at DESC
-            LIMIT 1
-        """)
-        result = cursor.fetchone()
-        last_strategy = result[0]
-        affected_keys_count = result[1]
+        result = refresher.metadata.latest_history("customer_metrics")
+        last_strategy = result["strategy_used"]
+        affected_keys_count = result["affected_keys_count"]
 
         assert last_strategy == "INCREMENTAL", "Second refresh should use INCREMENTAL strategy"
         assert affected_keys_count == 2, (
             "Should have exactly 2 affected keys: customer 100 (lost order) and 400 (gained order)"
         )
-
-        # Cleanup
-        duckdb_conn.execute("DROP TABLE IF EXISTS orders")
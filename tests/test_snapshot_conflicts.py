@@ -1,10 +1,29 @@
 """Test snapshot isolation conflicts in complex dependency chains."""
 
 import pytest
-from typing import Any
+from datetime import date
+from typing import Any, Tuple
 from dynamic_tables.refresh import DynamicTableRefresher
 from dynamic_tables.parser import DynamicTableDefinition
 
+# (order_id, product_id, amount, order_date) rows loaded into the base orders table
+_ORDERS_ROWS = [
+    (1, 101, 100.0, date(2024, 1, 1)),
+    (2, 102, 200.0, date(2024, 1, 2)),
+]
+
+
+def _orders_snapshots(cursor: Any) -> Tuple[int, int]:
+    """Fetch the orders snapshots recorded for B and C in one metadata query."""
+    cursor.execute("""
+        SELECT dynamic_table, last_snapshot
+        FROM source_snapshots
+        WHERE dynamic_table IN ('order_summary_b', 'order_summary_c')
+        AND source_table = 'orders'
+    """)
+    snapshots = dict(cursor.fetchall())
+    return snapshots["order_summary_b"], snapshots["order_summary_c"]
+
 
 class TestSnapshotConflicts:
     """Test cases for handling conflicting snapshots in dependency chains."""
@@ -15,7 +34,7 @@ class TestSnapshotConflicts:
         return DynamicTableRefresher(metadata_store, duckdb_conn)
 
     def test_conflicting_snapshots_from_multiple_dependencies(
-        self, refresher: Any, duckdb_conn: Any
+        self, refresher: Any, duckdb_conn: Any, meta_cursor: Any
     ) -> None:
         """Test that refreshing D auto-refreshes B and C together when they have conflicting snapshots.
 
@@ -23,22 +42,18 @@ class TestSnapshotConflicts:
         should detect this and automatically refresh B and C together in a transaction
         before refreshing D, ensuring consistency.
         """
-        # Create base table A
-        duckdb_conn.execute("""
-            CREATE TABLE orders (
-                order_id INTEGER,
-                product_id INTEGER,
-                amount DECIMAL(10,2),
-                order_date DATE
-            )
-        """)
-
-        # Insert initial data
-        duckdb_conn.execute("""
-            INSERT INTO orders VALUES
-            (1, 101, 100.00, '2024-01-01'),
-            (2, 102, 200.00, '2024-01-02')
-        """)
+        # Create base table A with its initial data in one statement
+        duckdb_conn.execute(
+            """
+            CREATE TABLE orders AS
+            SELECT
+                UNNEST(?::INTEGER[]) AS order_id,
+                UNNEST(?::INTEGER[]) AS product_id,
+                UNNEST(?::DOUBLE[]) AS amount,
+                UNNEST(?::DATE[]) AS order_date
+        """,
+            [list(column) for column in zip(*_ORDERS_ROWS)],
+        )
 
         # Create dynamic table B that depends on A
         refresher.create_dynamic_table(
@@ -51,10 +66,10 @@ class TestSnapshotConflicts:
         refresher.refresh_tables(["order_summary_b"])
 
         # Add more data to A (creates new snapshot)
-        duckdb_conn.execute("""
-            INSERT INTO orders VALUES
-            (3, 103, 300.00, '2024-01-03')
-        """)
+        duckdb_conn.execute(
+            "INSERT INTO orders VALUES (?, ?, ?, ?)",
+            [3, 103, 300.0, date(2024, 1, 3)],
+        )
 
         # Create dynamic table C that also depends on A
         refresher.create_dynamic_table(
@@ -67,22 +82,7 @@ class TestSnapshotConflicts:
         refresher.refresh_tables(["order_summary_c"])
 
         # Verify B and C used different snapshots of orders
-        cursor = refresher.metadata.conn.cursor()
-        cursor.execute("""
-            SELECT last_snapshot
-            FROM source_snapshots
-            WHERE dynamic_table = 'order_summary_b'
-            AND source_table = 'orders'
-        """)
-        b_snapshot_before = cursor.fetchone()[0]
-
-        cursor.execute("""
-            SELECT last_snapshot
-            FROM source_snapshots
-            WHERE dynamic_table = 'order_summary_c'
-            AND source_table = 'orders'
-        """)
-        c_snapshot_before = cursor.fetchone()[0]
+        b_snapshot_before, c_snapshot_before = _orders_snapshots(meta_cursor)
 
         assert b_snapshot_before != c_snapshot_before, (
             "B and C should have different snapshots initially"
@@ -109,21 +109,7 @@ class TestSnapshotConflicts:
         refresher.refresh_tables(["order_validation"])
 
         # Verify that B and C now use the same snapshot of orders
-        cursor.execute("""
-            SELECT last_snapshot
-            FROM source_snapshots
-            WHERE dynamic_table = 'order_summary_b'
-            AND source_table = 'orders'
-        """)
-        b_snapshot_after = cursor.fetchone()[0]
-
-        cursor.execute("""
-            SELECT last_snapshot
-            FROM source_snapshots
-            WHERE dynamic_table = 'order_summary_c'
-            AND source_table = 'orders'
-        """)
-        c_snapshot_after = cursor.fetchone()[0]
+        b_snapshot_after, c_snapshot_after = _orders_snapshots(meta_cursor)
 
         # They should now use the same snapshot (both were auto-refreshed)
         assert b_snapshot_after == c_snapshot_after, (
@@ -135,13 +121,6 @@ class TestSnapshotConflicts:
         assert c_snapshot_after != c_snapshot_before, "C should have been refreshed"
 
         # Verify D was refreshed successfully
-        cursor.execute("""
-            SELECT status
-            FROM refresh_history
-            WHERE dynamic_table = 'order_validation'
-            ORDER BY started_at DESC
-            LIMIT 1
-        """)
-        result = cursor.fetchone()
+        result = refresher.metadata.latest_history("order_validation")
         assert result is not None
-        assert result[0] == "SUCCESS", "order_validation should refresh successfully"
+        assert result["status"] == "SUCCESS", "order_validation should refresh successfully"